@@ -1,16 +1,68 @@
+import os
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import FOAF, OWL, RDF, RDFS, XSD
+
+from compressed_io import compression_of, parse_file, rdf_format, serialize_file
+from nt_journal import JournaledGraph, append_delta, journal_path, replay_journal
+from parallel_loader import load_ntriples
+from snapshot import load_snapshot, snapshot_path, write_snapshot
+from sqlite_store import SQLiteStore
+from uri_factory import URIFactory
+
+
 class OntologyBuilder:
-    def __init__(self, filepath=None):
+    def __init__(self, filepath=None, store="memory", store_path=None, snapshot=True,
+                 incremental=False, journal_threshold=64 * 1024 * 1024):
+        """
+        Args:
+            filepath (str): Ontology file loaded at startup and written by save()
+            store (str): "memory" for an in-memory Graph, or "sqlite" for a
+                persistent SQLiteStore that is opened instead of re-parsed
+            store_path (str): SQLite database path, defaults to ``filepath + ".sqlite"``
+            snapshot (bool): Write a binary snapshot next to every saved file and
+                load from it at startup when it is up to date
+            incremental (bool): Make save() append the triples changed since the
+                last save to an N-Triples journal instead of rewriting ``filepath``
+            journal_threshold (int): Journal size in bytes past which save()
+                compacts it into ``filepath``
+        """
         self.TRAVEL = URIRef("http://example.org/travel/")
-        self.graph = Graph()
+        self.uri_factory = URIFactory(self.TRAVEL)
         self.filepath = filepath
+        self.persistent = store == "sqlite"
+        self.snapshot = snapshot
+        self.incremental = incremental and not self.persistent
+        self.journal_threshold = journal_threshold
+
+        if self.persistent:
+            self.graph = Graph(store=SQLiteStore())
+            self.graph.open(store_path or f"{filepath}.sqlite", create=True)
+            if self.graph.store.is_empty():
+                # First open: seed the store once, later opens skip parsing.
+                self._load_or_create(filepath)
+                self.graph.commit()
+        elif store == "memory":
+            self.graph = JournaledGraph() if self.incremental else Graph()
+            self._load_or_create(filepath)
+            if filepath:
+                replay_journal(self.graph, journal_path(filepath))
+            if self.incremental:
+                # Loaded triples are already persisted; only track later changes.
+                self.graph.reset_delta()
+        else:
+            raise ValueError(f"Unknown store: {store}")
 
+    def _load_or_create(self, filepath):
         if filepath and os.path.exists(filepath):
-            self.graph.parse(filepath, format=guess_format(filepath))
+            if self.snapshot and load_snapshot(snapshot_path(filepath), filepath, self.graph) is not None:
+                return
+            parse_file(self.graph, filepath)
         else:
             self._create_base_ontology()
 
     def _uri(self, name):
-        return URIRef(self.TRAVEL + quote(name.replace(" ", "_")))
+        return self.uri_factory(name)
 
     def _create_base_ontology(self):
         self.graph.bind("travel", self.TRAVEL)
@@ -41,13 +93,75 @@ class OntologyBuilder:
             self.graph.add((prop_uri, RDFS.range, self._uri(range_) if isinstance(range_, str) else range_))
 
     def save(self, filepath=None):
+        if self.incremental and filepath in (None, self.filepath) and self.filepath:
+            if not os.path.exists(self.filepath):
+                self.compact()
+                return
+            journal = journal_path(self.filepath)
+            written = append_delta(self.graph, journal)
+            print(f"Journaled {written} changes to {journal}")
+            if os.path.exists(journal) and os.path.getsize(journal) > self.journal_threshold:
+                self.compact()
+            return
+        if self.persistent:
+            # Writes already live in the store; only export when asked to.
+            self.graph.commit()
+            if filepath is None:
+                return
         path = filepath or self.filepath
-        if path:
-            self.graph.serialize(path, format="turtle")
+        if path == self.filepath and not self.persistent:
+            self.compact()
+        elif path:
+            serialize_file(self.graph, path, format=self._format(path))
+            if self.snapshot:
+                write_snapshot(self.graph, snapshot_path(path), path)
             print(f"Saved ontology to {path}")
         else:
             raise ValueError("No filepath specified.")
 
+    def seed_from_dump(self, dump_path, workers=None):
+        """
+        Bulk-loads an N-Triples or N-Quads dump (e.g. a regional Wikidata extract) in parallel.
+
+        Returns:
+            dict: Throughput statistics from load_ntriples
+        """
+        stats = load_ntriples(self.graph, dump_path, workers=workers)
+        if self.persistent:
+            self.graph.commit()
+        print(f"Seeded {stats['triples']} triples from {dump_path} in {stats['seconds']:.1f}s "
+              f"({stats['triples_per_second']:.0f} triples/s)")
+        return stats
+
+    @staticmethod
+    def _format(path):
+        # Plain files are always written as Turtle; compressed ones follow their inner suffix.
+        return rdf_format(path, "turtle") if compression_of(path) else "turtle"
+
+    def compact(self):
+        """Merges the journal into the ontology file and truncates it."""
+        if self.persistent:
+            self.graph.commit()
+            return
+        if not self.filepath:
+            raise ValueError("No filepath specified.")
+        tmp_path = f"{self.filepath}.tmp"
+        serialize_file(self.graph, tmp_path, format=self._format(self.filepath),
+                       compression=compression_of(self.filepath))
+        os.replace(tmp_path, self.filepath)
+        if self.snapshot:
+            write_snapshot(self.graph, snapshot_path(self.filepath), self.filepath)
+        journal = journal_path(self.filepath)
+        if os.path.exists(journal):
+            os.remove(journal)
+        if self.incremental:
+            self.graph.reset_delta()
+        print(f"Compacted ontology into {self.filepath}")
+
+    def close(self):
+        if self.persistent:
+            self.graph.close(commit_pending_transaction=True)
+
     def get_graph(self):
         return self.graph
 
@@ -1,65 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rdflib import Literal
+from rdflib.namespace import RDF, RDFS
+
+from entity_registry import EntityRegistry
+
+
 class TravelDataProcessor:
-    def __init__(self, graph, uri_func):
+    # Triples are handed to the graph in chunks of this size, which bounds the
+    # buffer when bindings are streamed.
+    BULK_CHUNK = 10000
+
+    def __init__(self, graph, uri_func, registry=None):
         self.graph = graph
         self.uri = uri_func
+        self.city_class = uri_func("City")
+        self.country_class = uri_func("Country")
+        self.continent_class = uri_func("Continent")
+        self.poi_class = uri_func("PlaceOfInterest")
+        self.located_in = uri_func("locatedIn")
+        self.has_capital = uri_func("hasCapital")
+        self.located_in_continent = uri_func("locatedInContinent")
+        self.has_poi = uri_func("hasPlaceOfInterest")
+        self.category = uri_func("category")
+        # Shared country/capital/continent blocks are emitted once per graph
+        # rather than once per city, without probing the store.
+        self.registry = registry
+        if registry is None:
+            self.rebuild_registry()
+
+    def rebuild_registry(self):
+        """Reseeds the entity registry from the graph, e.g. after triples were added behind its back."""
+        self.registry = EntityRegistry.from_graph(self.graph, [self.city_class, self.country_class, self.continent_class])
 
-    def parse_city_info(self, results):
-        for binding in results.get("results", {}).get("bindings", []):
+    @staticmethod
+    def _limit_per_city(bindings, per_city_limit):
+        """Yields at most ``per_city_limit`` bindings for each ``?city`` of a batched result."""
+        if per_city_limit is None:
+            yield from bindings
+            return
+        counts = {}
+        for binding in bindings:
+            key = binding.get("city", binding.get("cityName", {})).get("value")
+            counts[key] = counts.get(key, 0) + 1
+            if counts[key] <= per_city_limit:
+                yield binding
+
+    def _commit(self, triples):
+        graph = self.graph
+        graph.addN((s, p, o, graph) for s, p, o in triples)
+        triples.clear()
+
+    def parse_city_info(self, results, per_city_limit=None):
+        self.parse_city_bindings(results.get("results", {}).get("bindings", []), per_city_limit)
+
+    def parse_city_bindings(self, bindings, per_city_limit=None):
+        uri = self.uri
+        seen = self.registry
+        triples = []
+        add = triples.append
+        for binding in self._limit_per_city(bindings, per_city_limit):
             city_name = binding.get("cityName", {}).get("value")
             country_name = binding.get("countryName", {}).get("value")
             capital_name = binding.get("capitalName", {}).get("value")
             continent_name = binding.get("continentName", {}).get("value")
 
             if city_name:
-                city_uri = self.uri(city_name)
-                self.graph.add((city_uri, RDF.type, self.uri("City")))
-                self.graph.add((city_uri, RDFS.label, Literal(city_name, lang="en")))
+                city_uri = uri(city_name)
+                add((city_uri, RDF.type, self.city_class))
+                add((city_uri, RDFS.label, Literal(city_name, lang="en")))
+                seen.add(city_uri, self.city_class)
 
                 if country_name:
-                    country_uri = self.uri(country_name)
-                    self.graph.add((city_uri, self.uri("locatedIn"), country_uri))
-                    self.graph.add((country_uri, RDF.type, self.uri("Country")))
-                    self.graph.add((country_uri, RDFS.label, Literal(country_name, lang="en")))
-
-                    if capital_name:
-                        capital_uri = self.uri(capital_name)
-                        self.graph.add((country_uri, self.uri("hasCapital"), capital_uri))
-                        self.graph.add((capital_uri, RDF.type, self.uri("City")))
-                        self.graph.add((capital_uri, RDFS.label, Literal(capital_name, lang="en")))
-
-                    if continent_name:
-                        continent_uri = self.uri(continent_name)
-                        self.graph.add((country_uri, self.uri("locatedInContinent"), continent_uri))
-                        self.graph.add((continent_uri, RDF.type, self.uri("Continent")))
-                        self.graph.add((continent_uri, RDFS.label, Literal(continent_name, lang="en")))
-
-    def parse_poi_info(self, results):
-        for binding in results.get("results", {}).get("bindings", []):
+                    country_uri = uri(country_name)
+                    add((city_uri, self.located_in, country_uri))
+                    if seen.add(country_uri, self.country_class):
+                        add((country_uri, RDF.type, self.country_class))
+                        add((country_uri, RDFS.label, Literal(country_name, lang="en")))
+
+                        if capital_name:
+                            capital_uri = uri(capital_name)
+                            add((country_uri, self.has_capital, capital_uri))
+                            if seen.add(capital_uri, self.city_class):
+                                add((capital_uri, RDF.type, self.city_class))
+                                add((capital_uri, RDFS.label, Literal(capital_name, lang="en")))
+
+                        if continent_name:
+                            continent_uri = uri(continent_name)
+                            add((country_uri, self.located_in_continent, continent_uri))
+                            if seen.add(continent_uri, self.continent_class):
+                                add((continent_uri, RDF.type, self.continent_class))
+                                add((continent_uri, RDFS.label, Literal(continent_name, lang="en")))
+
+            if len(triples) >= self.BULK_CHUNK:
+                self._commit(triples)
+        self._commit(triples)
+
+    def parse_poi_info(self, results, per_city_limit=None):
+        self.parse_poi_bindings(results.get("results", {}).get("bindings", []), per_city_limit)
+
+    def parse_poi_bindings(self, bindings, per_city_limit=None):
+        uri = self.uri
+        triples = []
+        add = triples.append
+        for binding in self._limit_per_city(bindings, per_city_limit):
             city_name = binding.get("cityName", {}).get("value")
             poi_name = binding.get("poiName", {}).get("value")
             poi_description = binding.get("poiDescription", {}).get("value")
             poi_type = binding.get("instanceOfLabel", {}).get("value")
 
             if city_name and poi_name:
-                city_uri = self.uri(city_name)
-                poi_uri = self.uri(poi_name)
+                city_uri = uri(city_name)
+                poi_uri = uri(poi_name)
 
-                self.graph.add((poi_uri, RDF.type, self.uri("PlaceOfInterest")))
-                self.graph.add((poi_uri, RDFS.label, Literal(poi_name, lang="en")))
-                self.graph.add((city_uri, self.uri("hasPlaceOfInterest"), poi_uri))
-                self.graph.add((poi_uri, self.uri("locatedIn"), city_uri))
+                add((poi_uri, RDF.type, self.poi_class))
+                add((poi_uri, RDFS.label, Literal(poi_name, lang="en")))
+                add((city_uri, self.has_poi, poi_uri))
+                add((poi_uri, self.located_in, city_uri))
 
                 if poi_description:
-                    self.graph.add((poi_uri, RDFS.comment, Literal(poi_description, lang="en")))
+                    add((poi_uri, RDFS.comment, Literal(poi_description, lang="en")))
                 if poi_type:
-                    self.graph.add((poi_uri, self.uri("category"), Literal(poi_type, lang="en")))
+                    add((poi_uri, self.category, Literal(poi_type, lang="en")))
 
-    def process_city(self, city_id, executor):
-        print(f"Processing city {city_id}...")
+            if len(triples) >= self.BULK_CHUNK:
+                self._commit(triples)
+        self._commit(triples)
+
+    def remove_city(self, city_uri):
+        """
+        Removes a city's own triples and its POIs before the city is re-ingested.
 
-        query1 = f"""SELECT ?cityName ?countryName ?capitalName ?continentName
+        POIs still linked from another city are kept; shared country and
+        continent blocks are left alone and re-added idempotently.
+        """
+        has_poi = self.has_poi
+        for poi_uri in list(self.graph.objects(city_uri, has_poi)):
+            self.graph.remove((city_uri, has_poi, poi_uri))
+            if next(self.graph.subjects(has_poi, poi_uri), None) is None:
+                self.graph.remove((poi_uri, None, None))
+        self.graph.remove((city_uri, None, None))
+        self.registry.discard(city_uri, self.city_class)
+
+    def city_info_query(self, city_id):
+        return self._city_info_query(f"BIND({city_id} AS ?city)", "LIMIT 1")
+
+    def city_info_batch_query(self, city_ids):
+        return self._city_info_query(f"VALUES ?city {{ {' '.join(city_ids)} }}", "")
+
+    def _city_info_query(self, city_clause, limit_clause):
+        return f"""SELECT ?city ?cityName ?countryName ?capitalName ?continentName
         WHERE {{
-          BIND({city_id} AS ?city)
+          {city_clause}
           ?city rdfs:label ?cityName .
           ?city wdt:P17 ?country .
           ?country rdfs:label ?countryName .
@@ -72,14 +164,34 @@ class TravelDataProcessor:
           FILTER (LANG(?countryName) = "en")
           FILTER (LANG(?continentName) = "en")
         }}
-        LIMIT 1"""
-        results1 = executor.run_query(query1)
-        if results1:
-            self.parse_city_info(results1)
+        {limit_clause}"""
+
+    def poi_query(self, city_id):
+        return self._poi_query(f"BIND({city_id} AS ?city)", "LIMIT 50")
+
+    def poi_page_query(self, city_id, page_size, offset):
+        # Ordering on every projected variable keeps the pages stable across requests.
+        return self._poi_query(
+            f"BIND({city_id} AS ?city)",
+            f"ORDER BY ?poiName ?instanceOfLabel ?poiDescription\n        LIMIT {page_size}\n        OFFSET {offset}",
+        )
 
-        query2 = f"""SELECT DISTINCT ?cityName ?poiName ?poiDescription ?instanceOfLabel
+    def poi_batch_query(self, city_ids, per_city_limit=50):
+        # A VALUES block cannot carry a per-city LIMIT, and without one the server
+        # enumerates every P131* descendant of every city in the batch. A UNION of
+        # LIMITed single-city subqueries bounds the work at per_city_limit rows each.
+        blocks = "\n          UNION\n          ".join(
+            "{ %s }" % self._poi_query(f"BIND({city_id} AS ?city)", f"LIMIT {per_city_limit}") for city_id in city_ids
+        )
+        return f"""SELECT ?city ?cityName ?poiName ?poiDescription ?instanceOfLabel
         WHERE {{
-          BIND({city_id} AS ?city)
+          {blocks}
+        }}"""
+
+    def _poi_query(self, city_clause, limit_clause):
+        return f"""SELECT DISTINCT ?city ?cityName ?poiName ?poiDescription ?instanceOfLabel
+        WHERE {{
+          {city_clause}
           ?city rdfs:label ?cityName .
           ?poi wdt:P131* ?city .
           ?poi wdt:P31 ?instanceOf .
@@ -99,7 +211,115 @@ class TravelDataProcessor:
           FILTER (LANG(?cityName) = "en")
           FILTER (LANG(?poiName) = "en")
         }}
-        LIMIT 50"""
-        results2 = executor.run_query(query2)
-        if results2:
-            self.parse_poi_info(results2)
+        {limit_clause}"""
+
+    def fetch_city(self, city_id, executor):
+        """Runs the city-info and POI queries for a city without touching the graph."""
+        return executor.run_query(self.city_info_query(city_id)), executor.run_query(self.poi_query(city_id))
+
+    def merge_city(self, city_results, poi_results):
+        if city_results:
+            self.parse_city_info(city_results)
+        if poi_results:
+            self.parse_poi_info(poi_results)
+
+    def process_city(self, city_id, executor, poi_page_size=None):
+        print(f"Processing city {city_id}...")
+        if poi_page_size is None:
+            self.merge_city(*self.fetch_city(city_id, executor))
+            return
+        self.merge_city(executor.run_query(self.city_info_query(city_id)), None)
+        self.process_city_pois_paginated(city_id, executor, page_size=poi_page_size)
+
+    def process_city_streaming(self, city_id, executor):
+        """
+        Processes a city from bindings streamed off the response body.
+
+        Requires an executor with ``iter_query``; each binding is added to the
+        graph as soon as it is decoded instead of after the whole result is parsed.
+        """
+        print(f"Processing city {city_id}...")
+        self.parse_city_bindings(executor.iter_query(self.city_info_query(city_id)))
+        self.parse_poi_bindings(executor.iter_query(self.poi_query(city_id)))
+
+    def iter_poi_pages(self, city_id, executor, page_size=50, max_pages=None):
+        """
+        Yields the POI results of a city one ``page_size`` page at a time.
+
+        Only the current page is held in memory; paging stops at the first short
+        or failed page, or after ``max_pages``.
+        """
+        offset = 0
+        pages = 0
+        while max_pages is None or pages < max_pages:
+            results = executor.run_query(self.poi_page_query(city_id, page_size, offset))
+            if not results:
+                return
+            yield results
+            if len(results.get("results", {}).get("bindings", [])) < page_size:
+                return
+            offset += page_size
+            pages += 1
+
+    def process_city_pois_paginated(self, city_id, executor, page_size=50, max_pages=None):
+        """Streams every POI of a city into the graph without the LIMIT 50 cap."""
+        for page in self.iter_poi_pages(city_id, executor, page_size=page_size, max_pages=max_pages):
+            self.parse_poi_info(page)
+
+    def process_cities_concurrently(self, city_ids, executor, max_workers=8):
+        """
+        Fetches cities on a thread pool and merges them into the graph.
+
+        At most ``max_workers`` queries are in flight at once. Only the calling
+        thread writes to the graph, so the rdflib Graph is never mutated concurrently.
+        """
+        for city_id, results in self.fetch_concurrently(city_ids, self.fetch_city, executor, max_workers):
+            print(f"Processing city {city_id}...")
+            self.merge_city(*results)
+
+    def fetch_batch(self, city_ids, executor):
+        """Runs one VALUES-bound city-info query and one POI query for a batch of cities."""
+        return executor.run_query(self.city_info_batch_query(city_ids)), executor.run_query(self.poi_batch_query(city_ids))
+
+    def merge_batch(self, city_results, poi_results, poi_limit=50):
+        # The per-city LIMITs of the single-city queries cannot be expressed in a
+        # VALUES query, so they are applied while splitting the bindings per city.
+        if city_results:
+            self.parse_city_info(city_results, per_city_limit=1)
+        if poi_results:
+            self.parse_poi_info(poi_results, per_city_limit=poi_limit)
+
+    def process_cities(self, city_ids, executor, batch_size=50, max_workers=1):
+        """
+        Processes cities in batches of ``batch_size``, two queries per batch.
+
+        Batches are fetched ``max_workers`` at a time and merged on the calling thread.
+
+        Returns:
+            list: IDs of the cities in batches where a query failed, which were
+            not (or only partly) ingested
+        """
+        batches = [tuple(city_ids[i:i + batch_size]) for i in range(0, len(city_ids), batch_size)]
+        failed = []
+        for batch, results in self.fetch_concurrently(batches, self.fetch_batch, executor, max_workers):
+            print(f"Processing cities {', '.join(batch)}...")
+            if None in results:
+                failed.extend(batch)
+                print(f"[SPARQL Error] Batch query failed for {', '.join(batch)}; their data is incomplete.")
+            self.merge_batch(*results)
+        if failed:
+            print(f"{len(failed)} of {len(city_ids)} cities were not fully ingested.")
+        return failed
+
+    @staticmethod
+    def fetch_concurrently(jobs, fetch, executor, max_workers):
+        """
+        Runs ``fetch(job, executor)`` for every job on a pool of ``max_workers`` threads.
+
+        Yields (job, result) pairs in completion order, so the caller can merge
+        each result on its own thread while the others are still in flight.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(fetch, job, executor): job for job in jobs}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
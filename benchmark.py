@@ -0,0 +1,122 @@
+import argparse
+import math
+import os
+import resource
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+from executor import SPARQLExecutor
+from Obuilder import OntologyBuilder
+from scheduler import RequestScheduler
+from stub_endpoint import StubSPARQLEndpoint, record_response
+from TDProcessor import TravelDataProcessor
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values``; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class TimedExecutor:
+    """Wraps an executor or scheduler, timing every query and optionally recording its response."""
+
+    def __init__(self, executor, record_dir=None):
+        self.executor = executor
+        self.record_dir = record_dir
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def run_query(self, query):
+        start = time.perf_counter()
+        results = self.executor.run_query(query)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+        if self.record_dir and results is not None:
+            record_response(self.record_dir, query, results)
+        return results
+
+
+def run_pipeline(endpoint_url, city_ids, workers=1, batch_size=0, rate=0, record_dir=None):
+    """
+    Runs the start.py ingestion pipeline against ``endpoint_url`` and measures it.
+
+    Returns:
+        dict: Throughput, request latency, save time and peak RSS figures
+    """
+    ontology = OntologyBuilder()
+    processor = TravelDataProcessor(ontology.get_graph(), ontology.get_uri)
+    base_triples = len(ontology.get_graph())
+
+    start = time.perf_counter()
+    with SPARQLExecutor(endpoint_url, pool_size=workers) as executor, \
+            (RequestScheduler(executor, rate=rate, workers=workers) if rate else nullcontext(executor)) as source:
+        timed = TimedExecutor(source, record_dir)
+        if batch_size:
+            processor.process_cities(city_ids, timed, batch_size=batch_size, max_workers=workers)
+        elif workers > 1:
+            processor.process_cities_concurrently(city_ids, timed, max_workers=workers)
+        else:
+            for cid in city_ids:
+                processor.process_city(cid, timed)
+    ingest_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_start = time.perf_counter()
+        ontology.save(os.path.join(tmp, "benchmark.ttl"))
+        save_seconds = time.perf_counter() - save_start
+
+    triples = len(ontology.get_graph()) - base_triples
+    return {
+        "cities": len(city_ids),
+        "requests": len(timed.latencies),
+        "triples": triples,
+        "ingest_seconds": ingest_seconds,
+        "cities_per_sec": len(city_ids) / ingest_seconds,
+        "triples_per_sec": triples / ingest_seconds,
+        "latency_p50_ms": percentile(timed.latencies, 50) * 1000,
+        "latency_p99_ms": percentile(timed.latencies, 99) * 1000,
+        "save_seconds": save_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline against a local replay endpoint.")
+    parser.add_argument("--cities", type=int, default=200, help="Number of synthetic QIDs to ingest.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=0, help="Route queries through the adaptive scheduler.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Replay server latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--pois-per-city", type=int, default=20)
+    parser.add_argument("--recordings", help="Replay recorded responses from this directory.")
+    parser.add_argument("--record-from", metavar="ENDPOINT",
+                        help="Run against a live endpoint and record its responses into --recordings.")
+    args = parser.parse_args()
+
+    city_ids = [f"wd:Q{1000 + i}" for i in range(args.cities)]
+    if args.record_from:
+        report = run_pipeline(args.record_from, city_ids, args.workers, args.batch_size, args.rate,
+                              record_dir=args.recordings)
+    else:
+        with StubSPARQLEndpoint(recordings=args.recordings, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                pois_per_city=args.pois_per_city) as stub:
+            report = run_pipeline(stub.url, city_ids, args.workers, args.batch_size, args.rate)
+
+    for key, value in report.items():
+        print(f"{key:>16}: {value:.2f}" if isinstance(value, float) else f"{key:>16}: {value}")
@@ -0,0 +1,172 @@
+import os
+
+from rdflib import Graph
+
+from nt_journal import parse_nt_lines, triple_to_nt
+from TDProcessor import TravelDataProcessor
+
+_BEGIN = "# BEGIN "
+_END = "# END "
+_COMPACTED = "# COMPACTED "
+
+
+class IngestJournal:
+    """
+    Append-only write-ahead journal of completed cities.
+
+    Each city is written as a ``# BEGIN <id>`` line, its triples in N-Triples
+    and an ``# END <id>`` line, then fsynced. A record without its END line
+    (a crash mid-write) is ignored on replay. Compaction keeps only
+    ``# COMPACTED <id>`` markers once the triples are in the ontology file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _records(self):
+        """Yields (city_id, triple lines or None for compacted cities) for complete records."""
+        if not os.path.exists(self.path):
+            return
+        current, lines = None, []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith(_COMPACTED):
+                    yield line[len(_COMPACTED):], None
+                elif line.startswith(_BEGIN):
+                    current, lines = line[len(_BEGIN):], []
+                elif line.startswith(_END):
+                    if current == line[len(_END):]:
+                        yield current, lines
+                    current, lines = None, []
+                elif current is not None and line:
+                    lines.append(line)
+
+    def completed(self):
+        return {city_id for city_id, _ in self._records()}
+
+    def replay(self, graph):
+        """
+        Adds the triples of every complete, not yet compacted record to ``graph``.
+
+        Returns:
+            set: IDs of all completed cities, compacted or not
+        """
+        completed = set()
+        for city_id, lines in self._records():
+            completed.add(city_id)
+            if lines:
+                parse_nt_lines(lines, graph)
+        return completed
+
+    def append(self, city_id, triples):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{_BEGIN}{city_id}\n")
+            for triple in triples:
+                f.write(triple_to_nt(triple) + "\n")
+            f.write(f"{_END}{city_id}\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, completed):
+        """Replaces the journal with COMPACTED markers for ``completed`` cities."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for city_id in sorted(completed):
+                f.write(f"{_COMPACTED}{city_id}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CheckpointedIngest:
+    """
+    Crash-safe ingestion loop around a TravelDataProcessor.
+
+    Every finished city is journaled before it counts as done, the ontology
+    file is rewritten every ``compact_every`` cities, and a resumed run
+    replays the journal and skips completed cities, so a crash only loses
+    the cities that were in flight.
+    """
+
+    def __init__(self, ontology, processor, journal_path, compact_every=50):
+        """
+        Args:
+            ontology (OntologyBuilder): Ontology whose file receives compacted triples
+            processor (TravelDataProcessor): Processor bound to the ontology graph
+            journal_path (str): Path of the append-only journal
+            compact_every (int): Completed cities between two compactions
+        """
+        self.ontology = ontology
+        self.processor = processor
+        self.journal = IngestJournal(journal_path)
+        self.compact_every = compact_every
+        self.completed = set()
+
+    def compact(self):
+        self.ontology.compact()
+        self.journal.compact(self.completed)
+
+    def fetch_city(self, city_id, executor):
+        """
+        Runs a city's queries with ``execute`` so failures are seen rather than read as empty results.
+
+        Returns:
+            tuple: (city results, POI results), or None if any query failed
+        """
+        processor = self.processor
+        try:
+            return (executor.execute(processor.city_info_query(city_id)),
+                    executor.execute(processor.poi_query(city_id)))
+        except Exception as e:
+            print(f"[SPARQL Error] {city_id}: {e}")
+            return None
+
+    def run(self, city_ids, executor, resume=True, max_workers=1):
+        """
+        Ingests ``city_ids``, skipping cities a previous run already completed.
+
+        A city is only journaled once all of its queries succeeded; failed
+        cities stay pending and are fetched again by the next resumed run.
+
+        Returns:
+            list: IDs of the cities ingested by this run
+        """
+        graph = self.ontology.get_graph()
+        if resume:
+            self.completed = self.journal.replay(graph)
+            self.processor.rebuild_registry()
+        else:
+            self.journal.reset()
+            self.completed = set()
+
+        pending = [cid for cid in city_ids if cid not in self.completed]
+        print(f"Checkpointed ingest: {len(self.completed)} cities already done, {len(pending)} pending.")
+
+        ingested, failed = [], []
+        since_compaction = 0
+        fetched = self.processor.fetch_concurrently(pending, self.fetch_city, executor, max_workers)
+        for city_id, results in fetched:
+            if results is None:
+                failed.append(city_id)
+                continue
+            print(f"Processing city {city_id}...")
+            scratch = Graph()
+            TravelDataProcessor(scratch, self.processor.uri, registry=self.processor.registry).merge_city(*results)
+            self.journal.append(city_id, scratch)
+            graph.addN((s, p, o, graph) for s, p, o in scratch)
+            self.completed.add(city_id)
+            ingested.append(city_id)
+            since_compaction += 1
+            if since_compaction >= self.compact_every:
+                self.compact()
+                since_compaction = 0
+
+        self.compact()
+        if failed:
+            print(f"Checkpointed ingest: {len(failed)} cities failed and stay pending: {', '.join(failed)}")
+        return ingested
@@ -0,0 +1,226 @@
+import numpy as np
+from rdflib import URIRef
+from rdflib.store import VALID_STORE, Store
+
+from snapshot import INDEX_ORDERS as _ORDERS
+from snapshot import read_snapshot
+
+
+def _narrow(column, lo, hi, value):
+    """Narrows [lo, hi) of a sorted column slice to the rows equal to ``value``."""
+    part = column[lo:hi]
+    return lo + np.searchsorted(part, value, "left"), lo + np.searchsorted(part, value, "right")
+
+
+class CompactStore(Store):
+    """
+    Read-optimized rdflib Store keeping dictionary-encoded triples in NumPy arrays.
+
+    Every term is mapped to an integer id and the triples are held three times,
+    as int32 (or int64) arrays sorted in SPO, POS and OSP order, so each triple
+    pattern is answered by binary search over the index whose leading columns
+    are bound. Writes are staged and merged into the arrays on the next read,
+    which makes the store cheap to query but expensive to interleave reads and
+    writes on. Only the default graph is supported.
+
+    A store loaded from a snapshot queries the memory-mapped index columns in
+    place and decodes terms on first use; terms added later are numbered
+    after the snapshot's.
+    """
+
+    def __init__(self, configuration=None, identifier=None):
+        self._snapshot = None
+        self._base_terms = ()
+        self._terms = []
+        self._ids = {}
+        self._indexes = {}
+        self._staged_add = set()
+        self._staged_remove = set()
+        self._namespaces = {}
+        self._prefixes = {}
+        self._dtype = np.int32
+        super().__init__(configuration, identifier)
+        self._set_triples(np.empty((0, 3), dtype=self._dtype))
+
+    def open(self, configuration, create=False):
+        return VALID_STORE
+
+    def load_snapshot(self, path, source_path):
+        """
+        Replaces the contents with a binary snapshot, serving its sorted
+        index columns straight from the memory map.
+
+        Returns:
+            bool: False if the snapshot is missing or stale
+        """
+        snapshot = read_snapshot(path, source_path)
+        if snapshot is None:
+            return False
+        self._snapshot = snapshot
+        self._base_terms = snapshot.terms
+        self._terms = []
+        self._ids = {}
+        self._dtype = np.int32 if snapshot.width == 4 else np.int64
+        self._indexes = {
+            name: [np.frombuffer(column, dtype=self._dtype) if len(column) else np.empty(0, dtype=self._dtype)
+                   for column in columns]
+            for name, columns in snapshot.indexes.items()
+        }
+        self._staged_add.clear()
+        self._staged_remove.clear()
+        for prefix, namespace in snapshot.namespaces.items():
+            self.bind(prefix, URIRef(namespace))
+        return True
+
+    # Term dictionary
+
+    def _lookup(self, term):
+        term_id = self._ids.get(term)
+        if term_id is None and self._base_terms:
+            term_id = self._base_terms.get(term)
+        return term_id
+
+    def _term(self, term_id):
+        base = len(self._base_terms)
+        return self._base_terms[term_id] if term_id < base else self._terms[term_id - base]
+
+    def _intern(self, term):
+        term_id = self._lookup(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._base_terms) + len(self._terms)
+            self._terms.append(term)
+            if term_id >= 2 ** 31 and self._dtype is np.int32:
+                self._dtype = np.int64
+        return term_id
+
+    # Indexes
+
+    def _set_triples(self, spo):
+        self._indexes = {}
+        for name, order in _ORDERS.items():
+            rows = spo[:, order]
+            # lexsort sorts by its last key first.
+            rows = rows[np.lexsort((rows[:, 2], rows[:, 1], rows[:, 0]))]
+            self._indexes[name] = [np.ascontiguousarray(rows[:, i]) for i in range(3)]
+
+    def _spo(self):
+        s, p, o = self._indexes["spo"]
+        return np.stack((s, p, o), axis=1)
+
+    def _flush(self):
+        if not self._staged_add and not self._staged_remove:
+            return
+        spo = self._spo()
+        if self._staged_remove:
+            removed = np.array(sorted(self._staged_remove), dtype=self._dtype).reshape(-1, 3)
+            keep = ~_row_in(spo, removed)
+            spo = spo[keep]
+        if self._staged_add:
+            added = np.array(sorted(self._staged_add), dtype=self._dtype).reshape(-1, 3)
+            spo = np.concatenate((spo.astype(self._dtype), added[~_row_in(added, spo)]))
+        self._staged_add.clear()
+        self._staged_remove.clear()
+        self._set_triples(spo)
+
+    def _match(self, ids):
+        """Returns the (s, p, o) id arrays of all triples matching a pattern of ids or None."""
+        s, p, o = ids
+        if s is not None:
+            name, bound = "spo", (s, p, o)
+        elif p is not None:
+            name, bound = "pos", (p, o, None)
+        elif o is not None:
+            name, bound = "osp", (o, None, None)
+        else:
+            name, bound = "spo", (None, None, None)
+        columns = self._indexes[name]
+        lo, hi = 0, len(columns[0])
+        for column, value in zip(columns, bound):
+            if value is None:
+                break
+            lo, hi = _narrow(column, lo, hi, value)
+        rows = [c[lo:hi] for c in columns]
+        # Restore (s, p, o) column order.
+        order = _ORDERS[name]
+        s_ids, p_ids, o_ids = (rows[order.index(i)] for i in range(3))
+        # An SPO scan with s and o bound but p free cannot narrow on o.
+        if s is not None and p is None and o is not None:
+            mask = o_ids == o
+            s_ids, p_ids, o_ids = s_ids[mask], p_ids[mask], o_ids[mask]
+        return s_ids, p_ids, o_ids
+
+    def _pattern_ids(self, triple_pattern):
+        """Maps a pattern to term ids, or returns None if a bound term is unknown."""
+        ids = []
+        for term in triple_pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            term_id = self._lookup(term)
+            if term_id is None:
+                return None
+            ids.append(term_id)
+        return ids
+
+    # RDF APIs
+
+    def add(self, triple, context, quoted=False):
+        key = tuple(self._intern(term) for term in triple)
+        self._staged_remove.discard(key)
+        self._staged_add.add(key)
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o), None)
+
+    def remove(self, triple_pattern, context=None):
+        self._flush()
+        ids = self._pattern_ids(triple_pattern)
+        if ids is None:
+            return
+        self._staged_remove.update(zip(*(column.tolist() for column in self._match(ids))))
+
+    def triples(self, triple_pattern, context=None):
+        self._flush()
+        ids = self._pattern_ids(triple_pattern)
+        if ids is None:
+            return
+        term = self._term
+        for s, p, o in zip(*(column.tolist() for column in self._match(ids))):
+            yield (term(s), term(p), term(o)), iter(())
+
+    def __len__(self, context=None):
+        self._flush()
+        return len(self._indexes["spo"][0])
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # Namespaces
+
+    def bind(self, prefix, namespace, override=True):
+        namespace = URIRef(namespace)
+        if not override and (prefix in self._namespaces or namespace in self._prefixes):
+            return
+        self._namespaces.pop(self._prefixes.pop(namespace, None), None)
+        self._prefixes.pop(self._namespaces.pop(prefix, None), None)
+        self._namespaces[prefix] = namespace
+        self._prefixes[namespace] = prefix
+
+    def prefix(self, namespace):
+        return self._prefixes.get(URIRef(namespace))
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def namespaces(self):
+        yield from self._namespaces.items()
+
+
+def _row_in(rows, others):
+    """Boolean mask of the rows of an (n, 3) id array that also occur in ``others``."""
+    if not len(rows) or not len(others):
+        return np.zeros(len(rows), dtype=bool)
+    rows_v = np.ascontiguousarray(rows, dtype=np.int64).view([("", np.int64)] * 3).ravel()
+    others_v = np.ascontiguousarray(others, dtype=np.int64).view([("", np.int64)] * 3).ravel()
+    return np.isin(rows_v, others_v)
@@ -0,0 +1,312 @@
+import gzip
+import io
+import os
+import uuid
+import zlib
+from contextlib import contextmanager
+
+from rdflib import BNode, Graph, URIRef
+from rdflib.util import guess_format
+
+from nt_journal import LabelBNodes, parse_nt_lines, triple_to_nt
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+_ZSTD_STEP = 1 << 12
+# Blank nodes of compressed non-N-Triples files are written as skolem IRIs
+# under this prefix, as each member is parsed with its own blank node scope.
+_SKOLEM = str(BNode("").skolemize())
+
+
+def compression_of(path):
+    """Returns "gzip", "zstd" or None, from the file suffix."""
+    return COMPRESSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def rdf_format(path, default=None):
+    """Guesses the RDF syntax of a possibly compressed file from its inner suffix."""
+    if compression_of(path):
+        path = os.path.splitext(path)[0]
+    return guess_format(path) or default
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError("Reading or writing .zst files requires the 'zstandard' package.")
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    _require_zstd()
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _decompressor(compression):
+    if compression == "gzip":
+        return zlib.decompressobj(wbits=31)
+    _require_zstd()
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _compression_for(source, compression):
+    compression = compression or compression_of(_source_name(source))
+    if compression is None:
+        raise ValueError(f"Cannot tell the compression of {source!r}; pass compression=")
+    return compression
+
+
+def _source_name(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    name = getattr(source, "name", None)
+    return name if isinstance(name, str) else ""
+
+
+@contextmanager
+def _open_binary(source):
+    """Opens a path for reading, or passes an already open binary file object through unclosed."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        yield source
+
+
+def iter_decompressed(source, compression=None, read_size=1 << 16):
+    """
+    Streams the decompressed content of a gzip or zstd file.
+
+    ``source`` is a path or a binary file object (a socket file, a pipe, an
+    HTTP response) that is read ``read_size`` bytes at a time, and gzip
+    output comes in pieces of at most ``read_size`` bytes, so memory does not
+    depend on the size of the file or of its members. Files are read as
+    a sequence of gzip members or zstd frames, which is how ``serialize_file``
+    chunks them, and each member can be consumed as soon as its bytes have
+    arrived.
+
+    Args:
+        source (str | file): Path or binary file object
+        compression (str): "gzip" or "zstd", from the file name if omitted
+
+    Yields:
+        tuple: (decompressed bytes, True if they end a member)
+    """
+    compression = _compression_for(source, compression)
+    decompressor = _decompressor(compression)
+    with _open_binary(source) as f:
+        for data in iter(lambda: f.read(read_size), b""):
+            full = False
+            while data or full:
+                if compression == "gzip":
+                    out = decompressor.decompress(data, read_size)
+                    # At the end of a member the rest of the input is in unused_data alone.
+                    data = b"" if decompressor.eof else decompressor.unconsumed_tail
+                    full = len(out) == read_size
+                else:
+                    # zstd's decompressobj has no output limit, so it gets small
+                    # input steps to keep highly compressed output in proportion.
+                    out = decompressor.decompress(data[:_ZSTD_STEP])
+                    data = data[_ZSTD_STEP:]
+                if decompressor.eof:
+                    yield out, True
+                    data = decompressor.unused_data + data
+                    decompressor = _decompressor(compression)
+                    full = False
+                elif out:
+                    yield out, False
+
+
+class _MemberReader(io.RawIOBase):
+    """Read-only binary stream over one member of a shared iter_decompressed stream."""
+
+    def __init__(self, chunks, data, end):
+        self._chunks = chunks
+        self._pending = data
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._end:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise EOFError("Input ends in a truncated compressed stream")
+            self._pending, self._end = chunk
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def drain(self):
+        while self.readinto(bytearray(1 << 16)):
+            pass
+
+
+def iter_member_streams(source, compression=None):
+    """
+    Yields each gzip member or zstd frame in turn as a binary stream of its decompressed bytes.
+
+    A member is decompressed as its stream is read, never buffered whole;
+    whatever of it is left unread is skipped when the next one is requested.
+    """
+    chunks = iter_decompressed(source, compression)
+    for data, end in chunks:
+        if end and not data:
+            continue
+        reader = _MemberReader(chunks, data, end)
+        with io.BufferedReader(reader) as stream:
+            yield stream
+            reader.drain()
+
+
+def iter_members(source, compression=None):
+    """Yields the decompressed bytes of each gzip member or zstd frame in turn."""
+    parts = []
+    for data, end in iter_decompressed(source, compression):
+        parts.append(data)
+        if end:
+            yield b"".join(parts)
+            parts = []
+    if any(parts):
+        raise EOFError(f"{_source_name(source) or 'Input'} ends in a truncated {_compression_for(source, compression)} stream")
+
+
+def iter_lines(source, compression=None):
+    """Yields the decoded lines of a compressed text file without buffering it whole."""
+    tail = b""
+    for data, _ in iter_decompressed(source, compression):
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8")
+    if tail:
+        yield tail.decode("utf-8")
+
+
+def parse_file(graph, source, default_format=None, compression=None, batch_size=10000):
+    """
+    Parses a plain, ``.gz`` or ``.zst`` RDF file into ``graph``.
+
+    ``source`` is a path or a binary file object; the format and compression
+    of a file object come from its name or the arguments. Compressed
+    N-Triples are parsed line by line in batches of ``batch_size``. Other
+    syntaxes are parsed one member at a time from a decompressing stream, so
+    a single-member file written by another tool goes through rdflib's
+    incremental parsers (RDF/XML, N-Quads) without being buffered, and the
+    parsers that read a document whole (Turtle, TriG) hold one member, whose
+    size ``serialize_file`` bounds.
+
+    Blank nodes keep their identity across batches and members: N-Triples
+    batches share one blank node context, and the skolem IRIs
+    ``serialize_file`` writes for other syntaxes are mapped back to blank
+    nodes.
+    """
+    name = _source_name(source)
+    fmt = rdf_format(name, default_format) if name else default_format
+    if compression is None and name:
+        compression = compression_of(name)
+    if compression is None:
+        graph.parse(source=source, format=fmt)
+    elif fmt == "nt":
+        bnodes = LabelBNodes(f"f{uuid.uuid4().hex[:16]}")
+        batch = []
+        for line in iter_lines(source, compression):
+            batch.append(line)
+            if len(batch) >= batch_size:
+                parse_nt_lines(batch, graph, bnodes)
+                batch = []
+        parse_nt_lines(batch, graph, bnodes)
+    else:
+        sink = _DeskolemizingSink(graph)
+        for stream in iter_member_streams(source, compression):
+            sink.parse(source=stream, format=fmt)
+    return graph
+
+
+def _skolemize(term):
+    return term.skolemize() if isinstance(term, BNode) else term
+
+
+def _deskolemize(term):
+    if isinstance(term, URIRef) and term.startswith(_SKOLEM):
+        return BNode(term[len(_SKOLEM):])
+    return term
+
+
+class _DeskolemizingSink(Graph):
+    """
+    Parse target that passes every triple and prefix on to ``target``, with
+    the skolem IRIs serialize_file wrote turned back into blank nodes.
+
+    Nothing is stored here, so parsing a member costs no more memory than
+    parsing it into ``target`` directly.
+    """
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def add(self, triple):
+        s, p, o = triple
+        self.target.add((_deskolemize(s), p, _deskolemize(o)))
+        return self
+
+    def addN(self, quads):
+        self.target.addN((_deskolemize(s), p, _deskolemize(o), self.target) for s, p, o, _ in quads)
+        return self
+
+    def bind(self, prefix, namespace, override=True, replace=False):
+        self.target.bind(prefix, namespace, override=override, replace=replace)
+
+
+def _chunks(graph, chunk_triples):
+    """Groups the triples of ``graph`` into lists of about ``chunk_triples``, never splitting a subject."""
+    chunk = []
+    for subject in graph.subjects(unique=True):
+        chunk.extend(graph.triples((subject, None, None)))
+        if len(chunk) >= chunk_triples:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def serialize_file(graph, path, format="turtle", compression=None, chunk_triples=20000):
+    """
+    Serializes ``graph`` to a plain or compressed file.
+
+    With compression (from ``compression`` or the path suffix) the output is
+    written chunk by chunk, each chunk of at most about ``chunk_triples``
+    triples being an independent gzip member or zstd frame holding a complete
+    document. Concatenated N-Triples or Turtle chunks still form one valid
+    document, so standard tools read such files as usual. Blank nodes are
+    written under their own ids, as N-Triples labels or, in other syntaxes,
+    as skolem IRIs (a chunk's ``[]`` or ``_:`` would only be scoped to its
+    member), so parse_file joins them again across chunks.
+    """
+    compression = compression or compression_of(path)
+    if compression is None:
+        graph.serialize(path, format=format)
+        return
+    if compression == "zstd":
+        _require_zstd()
+    namespaces = list(graph.namespaces())
+    with open(path, "wb") as f:
+        for chunk in _chunks(graph, chunk_triples):
+            if format == "nt":
+                data = ("\n".join(triple_to_nt(t) for t in chunk) + "\n").encode("utf-8")
+            else:
+                part = Graph()
+                for prefix, namespace in namespaces:
+                    part.bind(prefix, namespace, override=True)
+                part.addN((_skolemize(s), p, _skolemize(o), part) for s, p, o in chunk)
+                data = part.serialize(format=format, encoding="utf-8")
+            f.write(_compress(data, compression))
+        f.flush()
+        os.fsync(f.fileno())
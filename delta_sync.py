@@ -0,0 +1,144 @@
+import json
+import os
+
+from rdflib import URIRef
+
+
+class SyncIndex:
+    """
+    JSON sidecar recording, per Wikidata city ID, the ``schema:dateModified``
+    seen at the last fetch and the graph URI the city was written under.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, city_id):
+        return self.entries.get(city_id)
+
+    def record(self, city_id, modified, uri):
+        self.entries[city_id] = {"modified": modified, "uri": str(uri) if uri else None}
+
+    def save(self):
+        """Writes the index atomically so a crash never leaves a truncated sidecar."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class DeltaSync:
+    """
+    Refreshes only the cities whose Wikidata entity changed since the last run.
+
+    One cheap VALUES query per batch asks for ``schema:dateModified``; cities
+    whose timestamp differs from the SyncIndex are re-ingested, so a refresh
+    costs O(churn) instead of O(KG). A changed batch is fetched completely
+    before any of its old triples are removed, and its new stamps are only
+    recorded once it was merged, so a failed fetch leaves the cities as they
+    were and retries them on the next run.
+    """
+
+    def __init__(self, processor, executor, index, batch_size=200):
+        """
+        Args:
+            processor (TravelDataProcessor): Processor writing into the ontology graph
+            executor (SPARQLExecutor): Executor or RequestScheduler, anything with
+                an ``execute(query, use_cache=...)`` that raises on failure
+            index (SyncIndex): Sidecar of previously fetched modification times
+            batch_size (int): Cities per modification and ingestion query
+        """
+        self.processor = processor
+        self.executor = executor
+        self.index = index
+        self.batch_size = batch_size
+
+    @staticmethod
+    def modification_query(city_ids):
+        return f"""SELECT ?city ?cityName ?modified
+        WHERE {{
+          VALUES ?city {{ {' '.join(city_ids)} }}
+          ?city schema:dateModified ?modified .
+          OPTIONAL {{ ?city rdfs:label ?cityName . FILTER (LANG(?cityName) = "en") }}
+        }}"""
+
+    def fetch_modifications(self, city_ids):
+        """
+        Asks the endpoint for current modification times, bypassing the response cache.
+
+        Returns:
+            dict: city ID -> (dateModified string, English label or None)
+        """
+        stamps = {}
+        for i in range(0, len(city_ids), self.batch_size):
+            try:
+                # A cached answer would hide every upstream edit for the cache's TTL.
+                results = self.executor.execute(self.modification_query(city_ids[i:i + self.batch_size]),
+                                                use_cache=False)
+            except Exception as e:
+                print(f"[SPARQL Error] {e}")
+                continue
+            for binding in results.get("results", {}).get("bindings", []):
+                city_id = "wd:" + binding["city"]["value"].rsplit("/", 1)[-1]
+                stamps[city_id] = (binding["modified"]["value"], binding.get("cityName", {}).get("value"))
+        return stamps
+
+    def refresh_batch(self, city_ids, stamps):
+        """
+        Replaces the triples of ``city_ids`` with freshly fetched ones.
+
+        Raises:
+            SPARQLRequestError: A query was answered with an error status; the graph is unchanged
+            OSError: A query failed at the network level; the graph is unchanged
+        """
+        processor = self.processor
+        # Changed cities must come from the endpoint, not from a cached copy of their old state.
+        city_results = self.executor.execute(processor.city_info_batch_query(city_ids), use_cache=False)
+        poi_results = self.executor.execute(processor.poi_batch_query(city_ids), use_cache=False)
+
+        for city_id in city_ids:
+            entry = self.index.get(city_id)
+            if entry and entry["uri"]:
+                processor.remove_city(URIRef(entry["uri"]))
+        processor.merge_batch(city_results, poi_results)
+
+        for city_id in city_ids:
+            modified, name = stamps.get(city_id, (None, None))
+            self.index.record(city_id, modified, processor.uri(name) if name else None)
+
+    def sync(self, city_ids):
+        """
+        Re-ingests the cities that are new or modified upstream.
+
+        Cities whose modification time could not be fetched are treated as
+        changed. Batches whose refetch fails keep their old triples and stamps.
+
+        Returns:
+            list: IDs of the cities that were refreshed
+        """
+        stamps = self.fetch_modifications(city_ids)
+        changed = []
+        for city_id in city_ids:
+            entry = self.index.get(city_id)
+            modified = stamps.get(city_id, (None, None))[0]
+            if entry is None or modified is None or entry["modified"] != modified:
+                changed.append(city_id)
+
+        refreshed = []
+        for i in range(0, len(changed), self.batch_size):
+            batch = changed[i:i + self.batch_size]
+            print(f"Processing cities {', '.join(batch)}...")
+            try:
+                self.refresh_batch(batch, stamps)
+            except Exception as e:
+                print(f"[SPARQL Error] Keeping {len(batch)} cities unchanged: {e}")
+                continue
+            refreshed.extend(batch)
+        self.index.save()
+        print(f"Delta sync: {len(refreshed)} of {len(changed)} changed cities refreshed "
+              f"({len(city_ids)} checked).")
+        return refreshed
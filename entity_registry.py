@@ -0,0 +1,39 @@
+from rdflib.namespace import RDF
+
+
+class EntityRegistry:
+    """
+    In-memory index of (entity URI, class URI) pairs already emitted to a graph.
+
+    Ingestion consults it instead of probing the store with
+    ``(uri, RDF.type, cls) in graph``, which is I/O per probe on a persistent
+    store, and to skip re-emitting shared country/continent blocks per city.
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    @classmethod
+    def from_graph(cls, graph, classes):
+        """Seeds a registry with every typed instance of ``classes`` already in ``graph``."""
+        registry = cls()
+        for class_uri in classes:
+            registry._seen.update((s, class_uri) for s in graph.subjects(RDF.type, class_uri))
+        return registry
+
+    def add(self, uri, class_uri):
+        """Marks an entity as emitted; returns False if it already was."""
+        key = (uri, class_uri)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def discard(self, uri, class_uri):
+        self._seen.discard((uri, class_uri))
+
+    def __contains__(self, key):
+        return key in self._seen
+
+    def __len__(self):
+        return len(self._seen)
@@ -1,13 +1,163 @@
+import json
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+
+from SPARQLWrapper import JSON, POST, SPARQLWrapper
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+
+from http_pool import HTTPConnectionPool
+from sparql_stream import iter_bindings
+
+
+class SPARQLRequestError(Exception):
+    """A SPARQL request that the endpoint answered with an HTTP error status."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
 class SPARQLExecutor:
-    def __init__(self, endpoint_url):
+    # Longer queries are POSTed by the SPARQLWrapper path.
+    MAX_GET_QUERY = 2000
+
+    def __init__(self, endpoint_url, cache=None, pool_size=None, timeout=30.0,
+                 user_agent="TravelGuideOntology/1.0"):
+        """
+        Args:
+            endpoint_url (str): SPARQL endpoint URL
+            cache (SPARQLResponseCache): Optional persistent response cache
+            pool_size (int): Number of keep-alive connections; None sends each
+                query through a fresh SPARQLWrapper connection
+            timeout (float): Socket timeout in seconds for pooled connections
+            user_agent (str): User-Agent header for pooled requests
+        """
         self.endpoint_url = endpoint_url
+        self.cache = cache
+        self._pool = None
+        if pool_size:
+            self._pool = HTTPConnectionPool(endpoint_url, maxsize=pool_size, timeout=timeout,
+                                            headers={"User-Agent": user_agent})
+            self._path = urlsplit(endpoint_url).path or "/"
 
-    def run_query(self, query):
+    def _pooled_stream(self, query):
+        return self._pool.stream(
+            "POST", self._path,
+            body=urlencode({"query": query}),
+            headers={
+                "Accept": "application/sparql-results+json",
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+
+    @staticmethod
+    def _check_status(response):
+        if response.status != 200:
+            body = response.read(200)
+            raise SPARQLRequestError(f"HTTP {response.status}: {body.decode('utf-8', 'replace')}",
+                                     status=response.status, retry_after=response.headers.get("Retry-After"))
+
+    def _pooled_query(self, query):
+        with self._pooled_stream(query) as response:
+            self._check_status(response)
+            return json.loads(response.read())
+
+    def _wrapper_send(self, query):
         sparql = SPARQLWrapper(self.endpoint_url)
         sparql.setQuery(query)
         sparql.setReturnFormat(JSON)
+        if len(query) > self.MAX_GET_QUERY:
+            # Batched queries outgrow the URL length endpoints accept on GET.
+            sparql.setMethod(POST)
+        try:
+            return sparql.query()
+        except HTTPError as e:
+            raise SPARQLRequestError(f"HTTP {e.code}: {e.reason}", status=e.code,
+                                     retry_after=e.headers.get("Retry-After")) from e
+        except EndPointInternalError as e:
+            # SPARQLWrapper turns a 500 into its own exception and drops the status.
+            raise SPARQLRequestError(f"HTTP 500: {e}", status=500) from e
+
+    def cached(self, query):
+        """Returns the cached results of a query, or None on a miss or without a cache."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.endpoint_url, query)
+
+    def fetch(self, query, use_cache=True):
+        """
+        Sends a query to the endpoint without consulting the cache, storing the
+        response in it when ``use_cache`` is set.
+
+        Raises:
+            SPARQLRequestError: The endpoint answered with an error status
+            OSError: The request failed at the network level
+        """
+        results = self._pooled_query(query) if self._pool else self._wrapper_send(query).convert()
+        if use_cache and self.cache is not None:
+            self.cache.put(self.endpoint_url, query, results)
+        return results
+
+    def execute(self, query, use_cache=True):
+        """
+        Runs a query and returns the decoded JSON results.
+
+        Args:
+            query (str): SPARQL query
+            use_cache (bool): Read and fill the response cache; False always
+                asks the endpoint, for queries whose answer must be current
+
+        Raises:
+            SPARQLRequestError: The endpoint answered with an error status
+            OSError: The request failed at the network level
+        """
+        if use_cache:
+            cached = self.cached(query)
+            if cached is not None:
+                return cached
+        return self.fetch(query, use_cache)
+
+    def iter_query(self, query):
+        """
+        Runs a query and yields its bindings as they are decoded from the response body.
+
+        Cached responses are replayed from the cache, but streamed responses are
+        not written to it since that would need the whole document in memory.
+
+        Raises:
+            SPARQLRequestError: The endpoint answered with an error status
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.endpoint_url, query)
+            if cached is not None:
+                yield from cached.get("results", {}).get("bindings", [])
+                return
+
+        if self._pool:
+            with self._pooled_stream(query) as response:
+                self._check_status(response)
+                yield from iter_bindings(response)
+                response.read()
+            return
+
+        response = self._wrapper_send(query).response
+        with response:
+            yield from iter_bindings(response)
+
+    def run_query(self, query):
         try:
-            return sparql.query().convert()
+            return self.execute(query)
         except Exception as e:
             print(f"[SPARQL Error] {e}")
             return None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+from rdflib.namespace import RDF, RDFS
+
+# Row shapes of the matching TravelGuideQuery.QUERIES, so callers format
+# native rows and SPARQL rows with the same code.
+CityDetailsRow = namedtuple("CityDetailsRow", "name country countryName capital capitalName continent continentName")
+POIRow = namedtuple("POIRow", "poi name description category")
+CityRow = namedtuple("CityRow", "city name")
+
+
+class FastPath:
+    """
+    Answers TravelGuideQuery's fixed lookups straight from triple patterns.
+
+    Each method walks the same graph patterns as its SPARQL query and yields
+    the same rows, one per solution of the query (OPTIONAL blocks without a
+    match give a single row of Nones), skipping SPARQL parsing, algebra and
+    the evaluator.
+    """
+
+    def __init__(self, graph, uri_func):
+        self.graph = graph
+        self.city_class = uri_func("City")
+        self.located_in = uri_func("locatedIn")
+        self.has_capital = uri_func("hasCapital")
+        self.located_in_continent = uri_func("locatedInContinent")
+        self.has_poi = uri_func("hasPlaceOfInterest")
+        self.category = uri_func("category")
+
+    def _labelled(self, subject, predicate):
+        """(object, label) pairs for ``subject predicate ?x . ?x rdfs:label ?label``."""
+        objects = self.graph.objects
+        return [(obj, label) for obj in objects(subject, predicate) for label in objects(obj, RDFS.label)]
+
+    def cities(self):
+        return self.graph.subjects(RDF.type, self.city_class)
+
+    def city_rows(self, city):
+        """all_city_rows restricted to one city."""
+        for name in self.graph.objects(city, RDFS.label):
+            yield CityRow(city, name)
+
+    def all_city_rows(self):
+        for city in self.cities():
+            yield from self.city_rows(city)
+
+    def city_details_rows(self, city):
+        graph = self.graph
+        if (city, RDF.type, self.city_class) not in graph:
+            return
+        for name in graph.objects(city, RDFS.label):
+            countries = self._labelled(city, self.located_in)
+            if not countries:
+                yield CityDetailsRow(name, None, None, None, None, None, None)
+                continue
+            for country, country_name in countries:
+                capitals = self._labelled(country, self.has_capital) or [(None, None)]
+                continents = self._labelled(country, self.located_in_continent) or [(None, None)]
+                for capital, capital_name in capitals:
+                    for continent, continent_name in continents:
+                        yield CityDetailsRow(name, country, country_name, capital, capital_name,
+                                             continent, continent_name)
+
+    def pois(self, city):
+        return self.graph.objects(city, self.has_poi)
+
+    def poi_rows_of(self, poi):
+        """poi_rows restricted to one POI."""
+        objects = self.graph.objects
+        descriptions = list(objects(poi, RDFS.comment)) or [None]
+        categories = list(objects(poi, self.category)) or [None]
+        for name in objects(poi, RDFS.label):
+            for description in descriptions:
+                for category in categories:
+                    yield POIRow(poi, name, description, category)
+
+    def poi_rows(self, city):
+        for poi in self.pois(city):
+            yield from self.poi_rows_of(poi)
+
+    def cities_in_country_rows(self, country):
+        objects = self.graph.objects
+        for city in self.graph.subjects(self.located_in, country):
+            for name in objects(city, RDFS.label):
+                yield CityRow(city, name)
@@ -0,0 +1,109 @@
+import http.client
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class HTTPConnectionPool:
+    """
+    Thread-safe pool of persistent HTTP(S) connections to a single host.
+
+    Idle keep-alive connections are reused across requests and threads, so only
+    the first ``maxsize`` requests pay for the TCP connect and TLS handshake.
+    """
+
+    def __init__(self, url, maxsize=10, timeout=30.0, headers=None):
+        """
+        Args:
+            url (str): Base URL; only its scheme, host and port are used
+            maxsize (int): Maximum number of open connections
+            timeout (float): Socket timeout in seconds for connect and reads
+            headers (dict): Headers sent with every request
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._closed = False
+
+    def _new_connection(self):
+        conn_cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return conn_cls(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _checkin(self, conn, reusable):
+        if reusable and not self._closed:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    @contextmanager
+    def stream(self, method, path, body=None, headers=None):
+        """
+        Sends a request over a pooled connection and yields the unread response.
+
+        A request on a reused connection that the server already closed is
+        retried once on a fresh connection. The connection goes back to the
+        pool only if the response body was read to the end.
+
+        Yields:
+            http.client.HTTPResponse: Response whose body can be read incrementally
+        """
+        all_headers = {**self.headers, **(headers or {})}
+        conn, reused = self._checkout()
+        response = None
+        try:
+            try:
+                conn.request(method, path, body=body, headers=all_headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                conn.close()
+                conn = self._new_connection()
+                conn.request(method, path, body=body, headers=all_headers)
+                response = conn.getresponse()
+            yield response
+        finally:
+            reusable = response is not None and response.isclosed() and not response.will_close
+            self._checkin(conn, reusable)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Sends a request over a pooled connection and reads the whole response.
+
+        Returns:
+            tuple: (status, headers, body bytes)
+        """
+        with self.stream(method, path, body=body, headers=headers) as response:
+            return response.status, response.headers, response.read()
+
+    def close(self):
+        """Closes every idle connection; connections in use are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,100 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from operator import itemgetter
+
+_KEY = itemgetter(0)
+
+
+class SortedTerms:
+    """
+    Set of RDF terms ordered by their string form, for keyset paging.
+
+    Entries are (string, term) pairs in one list, so a reader walking it with
+    ``iter_from`` sees a consistent entry even while another thread inserts.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self, terms=()):
+        self._entries = sorted({(str(term), term) for term in terms}, key=_KEY)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, term):
+        key = str(term)
+        entries = self._entries
+        i = bisect_left(entries, key, key=_KEY)
+        if i == len(entries) or entries[i][0] != key:
+            entries.insert(i, (key, term))
+
+    def discard(self, term):
+        key = str(term)
+        entries = self._entries
+        i = bisect_left(entries, key, key=_KEY)
+        if i < len(entries) and entries[i][0] == key:
+            del entries[i]
+
+    def iter_from(self, key=""):
+        """
+        Yields (string, term) entries from the first one not sorting before ``key``.
+
+        Every step bisects past the entry it last yielded instead of keeping a
+        position, so concurrent inserts and removals never skip or repeat one.
+        """
+        entries = self._entries
+        i = bisect_left(entries, key, key=_KEY)
+        while i < len(entries):
+            entry = entries[i]
+            yield entry
+            i = bisect_right(entries, entry[0], key=_KEY)
+
+
+class KeysetIndex:
+    """
+    Sorted member lists of one-variable triple patterns, such as
+    ``(None, RDF.type, City)`` or ``(city, hasPlaceOfInterest, None)``.
+
+    A list is built on first use from one pattern lookup and then kept
+    current through a VersionedGraph's ``triple_added``/``triple_removed``
+    hooks, so writes never force a re-sort. At most ``maxsize`` lists are
+    kept, the least recently used being dropped (and rebuilt on demand).
+    """
+
+    def __init__(self, graph, maxsize=256):
+        self.graph = graph
+        self.maxsize = maxsize
+        self._lists = OrderedDict()
+        self._lock = threading.RLock()
+
+    def members(self, pattern):
+        """Returns the SortedTerms of the terms filling the one None position of ``pattern``."""
+        with self._lock:
+            terms = self._lists.get(pattern)
+            if terms is not None:
+                self._lists.move_to_end(pattern)
+                return terms
+            position = pattern.index(None)
+            terms = self._lists[pattern] = SortedTerms(
+                triple[position] for triple in self.graph.triples(pattern))
+            while len(self._lists) > self.maxsize:
+                self._lists.popitem(last=False)
+            return terms
+
+    def _patterns(self, triple):
+        s, p, o = triple
+        for pattern, term in (((None, p, o), s), ((s, p, None), o), ((s, None, o), p)):
+            terms = self._lists.get(pattern)
+            if terms is not None:
+                yield terms, term
+
+    def triple_added(self, triple):
+        with self._lock:
+            for terms, term in self._patterns(triple):
+                terms.add(term)
+
+    def triple_removed(self, triple):
+        with self._lock:
+            for terms, term in self._patterns(triple):
+                terms.discard(term)
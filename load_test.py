@@ -0,0 +1,124 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+from benchmark import percentile
+
+
+def build_paths(base_url, cities=200, seed=0):
+    """
+    Samples a request mix from a running service: city details, POI pages,
+    category search and batch lookups over up to ``cities`` known cities.
+    """
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    conn.request("GET", "/cities?" + urlencode({"limit": cities}))
+    rows = json.loads(conn.getresponse().read())
+    conn.close()
+    names = [row["uri"].rsplit("/", 1)[-1] for row in rows]
+    if not names:
+        raise ValueError(f"{base_url} serves no cities")
+
+    rng = random.Random(seed)
+    paths = []
+    for name in names:
+        encoded = quote(name, safe="")
+        paths.append(f"/cities/{encoded}")
+        paths.append(f"/cities/{encoded}/pois?limit=20")
+    paths.append("/pois/search?" + urlencode({"category": "museum", "limit": 20}))
+    for _ in range(max(1, len(names) // 20)):
+        batch = rng.sample(names, min(20, len(names)))
+        paths.append("/batch/city-details?" + urlencode([("name", n) for n in batch]))
+    rng.shuffle(paths)
+    return paths
+
+
+def run_load(base_url, paths, clients=8, duration=10.0):
+    """
+    Replays ``paths`` from ``clients`` keep-alive connections for ``duration`` seconds.
+
+    Returns:
+        dict: Requests, errors, requests per second and p50/p99/max latency in ms
+    """
+    parts = urlsplit(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local, failed = [], 0
+        i = index
+        while time.perf_counter() < stop_at:
+            path = paths[i % len(paths)]
+            i += clients
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running travel query service.")
+    parser.add_argument("--url", help="Base URL of a running query_service; omitted, one is started in-process.")
+    parser.add_argument("--ontology", default="travel_guide_ontology.ttl",
+                        help="Ontology served by the in-process service.")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads of the in-process service.")
+    parser.add_argument("--fast-path", action="store_true", help="Enable the fast path in the in-process service.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--cities", type=int, default=200, help="Cities sampled into the request mix.")
+    args = parser.parse_args()
+
+    service = None
+    if args.url:
+        url = args.url
+    else:
+        from query_service import TravelQueryService
+        from travel_data_parser import TravelGuideQuery
+
+        engine = TravelGuideQuery(args.ontology, fast_path=args.fast_path)
+        service = TravelQueryService(engine, workers=args.workers).start()
+        url = service.url
+    try:
+        report = run_load(url, build_paths(url, args.cities), clients=args.clients, duration=args.duration)
+    finally:
+        if service is not None:
+            service.stop()
+    for key, value in report.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,152 @@
+import os
+
+from rdflib import BNode, Graph, Literal
+
+_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term):
+    """Serializes a single rdflib term in N-Triples syntax."""
+    if isinstance(term, Literal):
+        text = f'"{str(term).translate(_ESCAPES)}"'
+        if term.language:
+            return f"{text}@{term.language}"
+        if term.datatype:
+            return f"{text}^^<{term.datatype}>"
+        return text
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    return f"<{term}>"
+
+
+def triple_to_nt(triple):
+    """Serializes a triple as one N-Triples line, without the trailing newline."""
+    s, p, o = triple
+    return f"{nt_term(s)} {nt_term(p)} {nt_term(o)} ."
+
+
+class LabelBNodes:
+    """
+    ``bnode_context`` for rdflib's line parsers naming each ``_:label`` after the
+    label and a per-document prefix, where rdflib would mint a fresh BNode per
+    parse call.
+
+    Every parse call sharing one context thereby maps a label to the same
+    BNode, so blank nodes still join across the batches of one document.
+    """
+
+    __slots__ = ("prefix",)
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def get(self, label, default=None):
+        return self.prefix + label
+
+    def __setitem__(self, label, bnode):
+        pass
+
+
+def parse_nt_lines(lines, graph=None, bnode_context=None):
+    """
+    Parses N-Triples lines into ``graph`` (a new Graph if omitted) and returns it.
+
+    Batches of one document must share a ``bnode_context`` (e.g. LabelBNodes)
+    for their blank node labels to denote the same nodes.
+    """
+    graph = Graph() if graph is None else graph
+    data = "\n".join(lines)
+    if data:
+        graph.parse(data=data, format="nt", bnode_context=bnode_context)
+    return graph
+
+
+_DELETE = "# DEL "
+
+
+def journal_path(source_path):
+    return f"{source_path}.journal.nt"
+
+
+class JournaledGraph(Graph):
+    """
+    Graph that records the triples added and removed since the last ``reset_delta``.
+
+    The delta is kept as two disjoint sets, so adding and then removing a
+    triple before the next save leaves no trace in the journal.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.added = set()
+        self.removed = set()
+
+    def _record_add(self, triple):
+        if triple in self.removed:
+            self.removed.discard(triple)
+        elif triple not in self:
+            self.added.add(triple)
+
+    def add(self, triple):
+        self._record_add(triple)
+        return super().add(triple)
+
+    def addN(self, quads):
+        quads = [q for q in quads if q[3] is self]
+        for s, p, o, _ in quads:
+            self._record_add((s, p, o))
+        return super().addN(quads)
+
+    def remove(self, triple):
+        for match in list(self.triples(triple)):
+            if match in self.added:
+                self.added.discard(match)
+            else:
+                self.removed.add(match)
+        return super().remove(triple)
+
+    def reset_delta(self):
+        self.added.clear()
+        self.removed.clear()
+
+
+def append_delta(graph, path):
+    """
+    Appends a JournaledGraph's delta to an N-Triples journal and clears it.
+
+    Removals are written first as ``# DEL`` comment lines, which plain
+    N-Triples parsers ignore, followed by the added triples.
+
+    Returns:
+        int: Number of journal lines written
+    """
+    lines = [_DELETE + triple_to_nt(t) for t in graph.removed]
+    lines.extend(triple_to_nt(t) for t in graph.added)
+    if lines:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    graph.reset_delta()
+    return len(lines)
+
+
+def replay_journal(graph, path, batch_size=10000):
+    """Applies an N-Triples journal written by append_delta to ``graph``, in order."""
+    if not os.path.exists(path):
+        return
+    batch = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith(_DELETE):
+                parse_nt_lines(batch, graph)
+                batch = []
+                for triple in parse_nt_lines([line[len(_DELETE):]]):
+                    graph.remove(triple)
+            elif line:
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    parse_nt_lines(batch, graph)
+                    batch = []
+    parse_nt_lines(batch, graph)
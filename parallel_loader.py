@@ -0,0 +1,169 @@
+import hashlib
+import os
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Dataset, Graph
+
+from compressed_io import compression_of, iter_lines, rdf_format
+from nt_journal import LabelBNodes
+
+
+def dump_bnode_prefix(path):
+    """Blank node id prefix for a dump, derived from its path, size and mtime."""
+    stat = os.stat(path)
+    identity = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    return "d" + hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def _parse(data, fmt, bnode_prefix):
+    """Parses an N-Triples or N-Quads text block into a list of triples, dropping graph names."""
+    bnodes = LabelBNodes(bnode_prefix)
+    if fmt == "nquads":
+        dataset = Dataset()
+        dataset.parse(data=data, format="nquads", bnode_context=bnodes)
+        return [(s, p, o) for s, p, o, _ in dataset.quads()]
+    graph = Graph()
+    graph.parse(data=data, format="nt", bnode_context=bnodes)
+    return list(graph)
+
+
+def _parse_block(data, fmt, bnode_prefix):
+    """
+    Parses a block of lines, falling back to line by line if the block is malformed.
+
+    Returns:
+        tuple: (triples, number of lines skipped as unparsable)
+    """
+    try:
+        return _parse(data, fmt, bnode_prefix), 0
+    except Exception:
+        triples, skipped = [], 0
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                triples.extend(_parse(line, fmt, bnode_prefix))
+            except Exception:
+                skipped += 1
+        return triples, skipped
+
+
+def _encode(triples):
+    # Shipping each distinct term once plus integer ids halves the pickling
+    # cost of handing rdflib terms back to the parent process.
+    ids, index = array("q"), {}
+    for triple in triples:
+        for term in triple:
+            ids.append(index.setdefault(term, len(index)))
+    return list(index), ids
+
+
+def _decode(terms, ids):
+    return [(terms[ids[i]], terms[ids[i + 1]], terms[ids[i + 2]]) for i in range(0, len(ids), 3)]
+
+
+def _parse_encoded(data, fmt, bnode_prefix):
+    triples, skipped = _parse_block(data, fmt, bnode_prefix)
+    return _encode(triples), skipped
+
+
+def _parse_range(path, start, end, fmt, bnode_prefix):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return _parse_encoded(data.decode("utf-8"), fmt, bnode_prefix)
+
+
+def split_ranges(path, chunk_bytes):
+    """Splits a file into (start, end) byte ranges of about ``chunk_bytes`` ending on line boundaries."""
+    size = os.path.getsize(path)
+    ranges, start = [], 0
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _line_blocks(path, chunk_bytes):
+    block, block_size = [], 0
+    for line in iter_lines(path):
+        block.append(line)
+        block_size += len(line) + 1
+        if block_size >= chunk_bytes:
+            yield "\n".join(block)
+            block, block_size = [], 0
+    if block:
+        yield "\n".join(block)
+
+
+def load_ntriples(graph, path, workers=None, chunk_bytes=8 << 20, batch_size=50000, fmt=None):
+    """
+    Loads a line-oriented N-Triples or N-Quads dump into ``graph`` with a process pool.
+
+    Plain files are split into byte ranges at line boundaries that workers read
+    themselves; ``.gz``/``.zst`` files are decompressed here and handed out as
+    line blocks. Parsed chunks are merged in file order with ``addN`` in
+    batches of ``batch_size``, with at most two chunks per worker in flight.
+    Quads are loaded into ``graph`` as triples. Blank node labels are mapped
+    to BNodes named after the label and the dump (see dump_bnode_prefix), so
+    the same label is one node however the file was chunked.
+
+    Args:
+        graph (Graph): Target graph, in any store
+        path (str): Dump file, optionally compressed
+        workers (int): Parser processes, defaults to the CPU count
+        chunk_bytes (int): Approximate size of the chunk parsed per task
+        batch_size (int): Triples per ``addN`` call
+        fmt (str): "nt" or "nquads", guessed from the file suffix if omitted
+
+    Returns:
+        dict: Triples loaded, lines skipped, seconds and triples per second
+    """
+    fmt = fmt or rdf_format(path, "nt")
+    if fmt not in ("nt", "nquads"):
+        raise ValueError(f"Parallel loading needs a line-oriented format, got {fmt}")
+    workers = workers or os.cpu_count() or 1
+    bnode_prefix = dump_bnode_prefix(path)
+    started = time.perf_counter()
+    stats = {"triples": 0, "skipped": 0}
+    last_report = started
+
+    def merge(future):
+        nonlocal last_report
+        encoded, skipped = future.result()
+        triples = _decode(*encoded)
+        stats["skipped"] += skipped
+        for i in range(0, len(triples), batch_size):
+            graph.addN((s, p, o, graph) for s, p, o in triples[i:i + batch_size])
+        stats["triples"] += len(triples)
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            print(f"Loaded {stats['triples']} triples ({stats['triples'] / (now - started):.0f} triples/s)")
+            last_report = now
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if compression_of(path):
+            tasks = ((_parse_encoded, block, fmt, bnode_prefix) for block in _line_blocks(path, chunk_bytes))
+        else:
+            tasks = ((_parse_range, path, start, end, fmt, bnode_prefix)
+                     for start, end in split_ranges(path, chunk_bytes))
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(*task))
+            if len(in_flight) >= 2 * workers:
+                merge(in_flight.popleft())
+        while in_flight:
+            merge(in_flight.popleft())
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["triples_per_second"] = stats["triples"] / stats["seconds"] if stats["seconds"] else 0.0
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} unparsable lines in {path}")
+    return stats
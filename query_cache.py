@@ -0,0 +1,185 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from rdflib import Graph
+
+_deadline = threading.local()
+# Triples yielded between two deadline checks of one triples() scan.
+_CHECK_EVERY = 1024
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@contextmanager
+def query_deadline(at):
+    """
+    Makes every VersionedGraph scan on this thread raise DeadlineExceeded once
+    ``time.monotonic()`` passes ``at``, so query evaluation can be abandoned
+    midway.
+    """
+    previous = getattr(_deadline, "at", None)
+    _deadline.at = at
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+
+def _checked(triples, at):
+    if time.monotonic() > at:
+        raise DeadlineExceeded()
+    for n, triple in enumerate(triples, 1):
+        if not n % _CHECK_EVERY and time.monotonic() > at:
+            raise DeadlineExceeded()
+        yield triple
+
+
+class VersionedGraph(Graph):
+    """
+    Graph that bumps ``version`` on every add, addN and remove.
+
+    Read caches compare the version they were filled at with the current one
+    instead of tracking which triples a cached result depended on. Derived
+    indexes register in ``listeners`` and get ``triple_added(triple)`` and
+    ``triple_removed(triple)`` calls for every concrete triple. Under
+    query_deadline, ``triples`` (which SPARQL evaluation and every pattern
+    lookup go through) enforces the deadline.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self.listeners = []
+
+    def add(self, triple):
+        self.version += 1
+        if self.listeners and triple not in self:
+            for listener in self.listeners:
+                listener.triple_added(triple)
+        return super().add(triple)
+
+    def addN(self, quads):
+        self.version += 1
+        if self.listeners:
+            quads = [q for q in quads if isinstance(q[3], Graph) and q[3].identifier == self.identifier]
+            # Listeners only hear about triples that are actually new.
+            new = {(s, p, o) for s, p, o, _ in quads if (s, p, o) not in self}
+            for listener in self.listeners:
+                for triple in new:
+                    listener.triple_added(triple)
+        return super().addN(quads)
+
+    def triples(self, triple):
+        at = getattr(_deadline, "at", None)
+        if at is None:
+            return super().triples(triple)
+        return _checked(super().triples(triple), at)
+
+    def remove(self, triple):
+        self.version += 1
+        if self.listeners:
+            for match in list(self.triples(triple)):
+                for listener in self.listeners:
+                    listener.triple_removed(match)
+        return super().remove(triple)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of query results tied to a graph version.
+
+    Every entry is dropped as soon as a lookup sees a newer graph version, so
+    a read-mostly graph keeps its results while any mutation invalidates them.
+    Values are deep-copied in and out so callers may mutate what they get.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Returns (True, value) on a hit and (False, None) on a miss."""
+        with self._lock:
+            self._sync(version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(self._entries[key])
+            self.misses += 1
+            return False, None
+
+    def put(self, key, version, value):
+        """Stores a value computed at graph ``version``, unless the cache has already seen a newer one."""
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return
+            self._sync(version)
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, invalidations, hit rate and current number of entries
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+def cached_query(query_id):
+    """
+    Caches a query method's result in ``self.cache`` keyed by (query_id, arguments).
+
+    The owner must expose ``cache`` (a ResultCache, or None to disable
+    caching) and ``graph`` (a VersionedGraph).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return method(self, *args, **kwargs)
+            key = (query_id, args, tuple(sorted(kwargs.items())))
+            version = self.graph.version
+            hit, value = self.cache.get(key, version)
+            if hit:
+                return value
+            value = method(self, *args, **kwargs)
+            # A write that landed while the method ran makes the value stale at birth.
+            if self.graph.version == version:
+                self.cache.put(key, version, value)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,400 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from pyparsing import ParseException
+from rdflib import BNode, Literal
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+
+from nt_journal import triple_to_nt
+from query_cache import DeadlineExceeded, query_deadline
+
+
+class _PooledHTTPServer(HTTPServer):
+    """HTTPServer handing connections to a fixed thread pool, shedding load with 503 once it is full."""
+
+    def __init__(self, address, handler, workers, backlog):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-service")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                                b"Retry-After: 1\r\nConnection: close\r\n\r\n")
+            finally:
+                self.shutdown_request(request)
+            return
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+class _ChunkedWriter:
+    """Buffers output into HTTP/1.1 chunks of about ``chunk_size`` bytes."""
+
+    def __init__(self, wfile, chunk_size=16384):
+        self.wfile = wfile
+        self.chunk_size = chunk_size
+        self._buffer = []
+        self._size = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._size:
+            data = b"".join(self._buffer)
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self._buffer, self._size = [], 0
+
+    def close(self):
+        self.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _remote_clause(query):
+    """Returns the first SERVICE or FROM clause of a prepared query, which rdflib would fetch over HTTP, or None."""
+    stack = [query.algebra]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CompValue):
+            if node.name == "ServiceGraphPattern":
+                return "SERVICE"
+            if node.name == "DatasetClause":
+                return "FROM"
+            stack.extend(node.values())
+        elif isinstance(node, (list, tuple)):
+            stack.extend(node)
+    return None
+
+
+def _sparql_term(term):
+    """Encodes an rdflib term as a SPARQL 1.1 JSON results binding value."""
+    if isinstance(term, Literal):
+        value = {"type": "literal", "value": str(term)}
+        if term.language:
+            value["xml:lang"] = term.language
+        elif term.datatype:
+            value["datatype"] = str(term.datatype)
+        return value
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    return {"type": "uri", "value": str(term)}
+
+
+class TravelQueryService:
+    """
+    Local HTTP service answering many concurrent readers from one TravelGuideQuery.
+
+    Serves a read-only SPARQL protocol endpoint at ``/sparql``, confined to
+    the local graph, and JSON routes for the query methods. Connections are handled by a pool of ``workers``
+    threads; once ``backlog`` more are waiting, new connections get an
+    immediate 503. A keep-alive connection holds its worker until it closes or
+    stays idle for ``idle_timeout``, so size ``workers`` to the number of
+    concurrent clients. List routes and SELECT results are streamed with chunked
+    transfer encoding as rows are produced, and every request has a
+    ``timeout`` deadline (answered with 504 when nothing was sent yet,
+    otherwise by cutting the stream). The deadline is also enforced inside
+    query evaluation, by the engine graph's triple scans (see
+    query_deadline), so a runaway query frees its worker within about
+    ``timeout``.
+    """
+
+    def __init__(self, engine, host="127.0.0.1", port=0, workers=8, backlog=64, timeout=10.0, idle_timeout=5.0):
+        """
+        Args:
+            engine (TravelGuideQuery): Loaded query engine shared by all requests
+            host (str): Interface to bind
+            port (int): Port to bind, 0 picks a free one
+            workers (int): Threads serving connections
+            backlog (int): Connections allowed to wait for a worker before 503s
+            timeout (float): Seconds a request may take before it is abandoned
+            idle_timeout (float): Seconds a keep-alive connection may sit idle
+        """
+        self.engine = engine
+        self.timeout = timeout
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        handler = self._handler_class()
+        handler.timeout = idle_timeout
+        self._server = _PooledHTTPServer((host, port), handler, workers, backlog)
+        self._thread = None
+        self.routes = [
+            (("cities",), self._cities),
+            (("cities", None), self._city_details),
+            (("cities", None, "pois"), self._city_pois),
+            (("countries", None, "cities"), self._country_cities),
+            (("pois", "search"), self._search_pois),
+            (("batch", "city-details"), self._batch_city_details),
+            (("batch", "pois"), self._batch_pois),
+            (("stats",), self._stats),
+        ]
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Routes: each takes the parse_qs parameters plus the path captures and
+    # returns (status, body) or (status, iterator of JSON values) to stream as an array.
+
+    @staticmethod
+    def _arg(params, key, default=None):
+        values = params.get(key)
+        return values[-1] if values else default
+
+    def _paging(self, params):
+        limit = self._arg(params, "limit")
+        return {"limit": int(limit) if limit is not None else None, "offset": int(self._arg(params, "offset", 0))}
+
+    def _cities(self, params):
+        return 200, self.engine.iter_all_cities(**self._paging(params))
+
+    def _city_details(self, params, name):
+        details = self.engine.get_city_details(name)
+        return (200, details) if details else (404, {"error": f"Unknown city: {name}"})
+
+    def _city_pois(self, params, name):
+        return 200, self.engine.iter_pois_for_city(name, **self._paging(params))
+
+    def _country_cities(self, params, name):
+        return 200, self.engine.get_cities_in_country(name)
+
+    def _search_pois(self, params):
+        if "q" in params:
+            return 200, self.engine.search_pois(self._arg(params, "q"), limit=int(self._arg(params, "limit", 10)))
+        if "category" in params:
+            return 200, self.engine.iter_search_pois_by_category(self._arg(params, "category"), **self._paging(params))
+        return 400, {"error": "Pass q= for keyword search or category= for category search"}
+
+    def _batch_city_details(self, params):
+        return 200, self.engine.get_city_details_many(params.get("name", []))
+
+    def _batch_pois(self, params):
+        return 200, self.engine.get_pois_for_cities(params.get("name", []))
+
+    def _stats(self, params):
+        stats = {"requests": self.requests, "errors": self.errors, "timeouts": self.timeouts}
+        if self.engine.cache is not None:
+            stats["cache"] = self.engine.cache.stats()
+        return 200, stats
+
+    def route(self, path, query_string):
+        """Resolves a path to (status, body), body being a JSON value or a row iterator."""
+        segments = tuple(unquote(s) for s in path.strip("/").split("/") if s)
+        params = parse_qs(query_string)
+        for pattern, handler in self.routes:
+            if len(pattern) != len(segments):
+                continue
+            if all(p is None or p == s for p, s in zip(pattern, segments)):
+                return handler(params, *(s for p, s in zip(pattern, segments) if p is None))
+        return 404, {"error": f"No route for {path}"}
+
+    def _sparql_results(self, query):
+        """
+        Runs a read-only SPARQL query, returning (status, content type, body or row iterator).
+
+        Queries with SERVICE or FROM clauses are refused: rdflib would resolve
+        them with outbound HTTP requests to whatever URL the client names.
+
+        Raises:
+            ValueError: The query reaches outside the local graph
+        """
+        graph = self.engine.graph
+        prepared = prepareQuery(query, initNs=dict(graph.namespaces()))
+        clause = _remote_clause(prepared)
+        if clause:
+            raise ValueError(f"{clause} clauses are not allowed; queries may only read the local graph")
+        result = graph.query(prepared)
+        if result.type == "ASK":
+            return 200, "application/sparql-results+json", {"head": {}, "boolean": bool(result.askAnswer)}
+        if result.type == "SELECT":
+            variables = [str(v) for v in result.vars]
+            rows = ({var: _sparql_term(row[var]) for var in variables if row[var] is not None} for row in result)
+            return 200, "application/sparql-results+json", (variables, rows)
+        return 200, "application/n-triples", (triple_to_nt(t) + "\n" for t in result)
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without TCP_NODELAY
+            # Nagle's algorithm and delayed ACKs add ~40 ms to every response.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path.rstrip("/") == "/sparql":
+                    self._sparql(parse_qs(parts.query).get("query", [""])[0])
+                else:
+                    self._dispatch(lambda: service.route(parts.path, parts.query))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                if urlsplit(self.path).path.rstrip("/") != "/sparql":
+                    self._send_json(405, {"error": "POST is only accepted on /sparql"})
+                elif self.headers.get("Content-Type", "").startswith("application/sparql-query"):
+                    self._sparql(body)
+                else:
+                    self._sparql(parse_qs(body).get("query", [""])[0])
+
+            def _sparql(self, query):
+                if not query:
+                    self._send_json(400, {"error": "Missing query"})
+                    return
+
+                def run():
+                    status, content_type, body = service._sparql_results(query)
+                    return status, body, content_type
+
+                self._dispatch(run)
+
+            def _dispatch(self, run):
+                deadline = time.monotonic() + service.timeout
+                with service._lock:
+                    service.requests += 1
+                with query_deadline(deadline):
+                    self._respond(run, deadline)
+
+            def _respond(self, run, deadline):
+                try:
+                    status, body, *content_type = run()
+                    content_type = content_type[0] if content_type else "application/json"
+                    if isinstance(body, (dict, list, str, int, float, bool)) or body is None:
+                        if time.monotonic() > deadline:
+                            raise DeadlineExceeded()
+                        self._send_json(status, body, content_type)
+                    else:
+                        self._stream(status, body, content_type, deadline)
+                except DeadlineExceeded:
+                    with service._lock:
+                        service.timeouts += 1
+                    self._send_json(504, {"error": f"Query exceeded {service.timeout}s"})
+                except (ValueError, ParseException) as e:
+                    self._send_json(400, {"error": str(e)})
+                except Exception as e:
+                    with service._lock:
+                        service.errors += 1
+                    self._send_json(500, {"error": str(e)})
+
+            def _send_json(self, status, body, content_type="application/json"):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, status, body, content_type, deadline):
+                if isinstance(body, tuple):
+                    variables, rows = body
+                    head = '{"head": {"vars": %s}, "results": {"bindings": [' % json.dumps(variables)
+                    tail = "]}}"
+                elif content_type == "application/n-triples":
+                    rows, head, tail = body, "", ""
+                else:
+                    rows, head, tail = body, "[", "]"
+                rows = iter(rows)
+                # Produce the first row before committing to a 200 so that
+                # errors and timeouts up to that point still get a status code.
+                first = next(rows, None)
+                if time.monotonic() > deadline:
+                    raise DeadlineExceeded()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                out = _ChunkedWriter(self.wfile)
+                out.write(head)
+                separator = "" if not tail and not head else ", "
+                count = 0
+                try:
+                    row = first
+                    while row is not None:
+                        if count and separator:
+                            out.write(separator)
+                        out.write(row if isinstance(row, str) else json.dumps(row))
+                        count += 1
+                        if time.monotonic() > deadline:
+                            raise DeadlineExceeded()
+                        row = next(rows, None)
+                except Exception as e:
+                    # Headers are gone; drop the connection so the client sees a truncated body.
+                    with service._lock:
+                        if isinstance(e, DeadlineExceeded):
+                            service.timeouts += 1
+                        else:
+                            service.errors += 1
+                    out.flush()
+                    self.close_connection = True
+                    return
+                out.write(tail)
+                out.close()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from travel_data_parser import TravelGuideQuery
+
+    parser = argparse.ArgumentParser(description="Serve a travel ontology over HTTP.")
+    parser.add_argument("ontology", nargs="?", default="travel_guide_ontology.ttl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8891)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--store", choices=["memory", "compact"], default="memory")
+    parser.add_argument("--fast-path", action="store_true", help="Answer lookups from triple patterns.")
+    args = parser.parse_args()
+
+    engine = TravelGuideQuery(args.ontology, store=args.store, fast_path=args.fast_path)
+    service = TravelQueryService(engine, host=args.host, port=args.port, workers=args.workers, timeout=args.timeout)
+    print(f"Serving {args.ontology} at {service.url} (SPARQL endpoint at {service.url}/sparql)")
+    try:
+        service._server.serve_forever()
+    except KeyboardInterrupt:
+        service._server.server_close()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+# Tokens whose text is significant as written: string literals (long forms
+# first), IRIs and comments, the latter with their line break. Any other
+# whitespace run is insignificant.
+_QUERY_TOKEN = re.compile(r"""
+    (?P<verbatim>
+        '''(?:[^'\\]|\\.|'(?!''))*'''
+      | \"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"
+      | '(?:[^'\\\n\r]|\\.)*'
+      | "(?:[^"\\\n\r]|\\.)*"
+      | <[^<>"{}|^`\\\x00-\x20]*>
+      | \#[^\n\r]*(?:\r\n|\n|\r)?
+    )
+  | \s+
+""", re.VERBOSE)
+
+
+def normalize_query(query):
+    """Collapses whitespace runs to one space, except inside string literals, IRIs and comments."""
+    return _QUERY_TOKEN.sub(lambda match: match.group("verbatim") or " ", query).strip()
+
+
+def cache_key(endpoint_url, query):
+    """Hashes an endpoint and a whitespace-normalized query into a cache key."""
+    normalized = normalize_query(query)
+    return hashlib.sha256(f"{endpoint_url}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class SPARQLResponseCache:
+    """
+    Persistent SQLite cache of SPARQL JSON responses.
+
+    Entries are keyed by endpoint plus normalized query text, expire after
+    ``ttl`` seconds and are evicted least-recently-used once the cache holds
+    more than ``max_entries`` responses. The number of entries is counted
+    once on open and then kept up to date by this instance, and expiry and
+    LRU order are indexed, so a put never scans the table.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None):
+        """
+        Args:
+            path (str): SQLite database file, created if missing
+            ttl (float): Default time-to-live of an entry in seconds, None for no expiry
+            max_entries (int): Maximum number of cached responses, None for unbounded
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_expiry ON responses (expires_at)")
+        self._conn.commit()
+        (self._entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+
+    def get(self, endpoint_url, query):
+        """Returns the cached results for a query, or None on a miss or an expired entry."""
+        key = cache_key(endpoint_url, query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._entries -= 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, endpoint_url, query, results, ttl=None):
+        """Stores the results of a query, overriding the default TTL if ``ttl`` is given."""
+        key = cache_key(endpoint_url, query)
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is None:
+                self._entries += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(results), expires_at, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        self._entries -= expired.rowcount
+        if self.max_entries is None:
+            return
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            evicted = self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+            self._entries -= evicted.rowcount
+            self.evictions += evicted.rowcount
+
+    def stats(self):
+        """
+        Returns cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, hit rate and current number of entries
+        """
+        entries = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,253 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+
+from executor import SPARQLRequestError
+
+
+def parse_retry_after(value):
+    """Converts a Retry-After header (delta-seconds or HTTP-date) to seconds, or None."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate follows server feedback.
+
+    The rate grows additively after each success and is cut multiplicatively
+    when the endpoint throttles, which converges on the highest rate the
+    quota sustains. Cuts are applied at most once per ``cooldown`` seconds so a
+    burst of 429s from requests already in flight counts as one signal. A
+    Retry-After hint also pauses every acquirer until it passes.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.1, max_rate=None, increase=None, decrease=0.5, cooldown=1.0):
+        """
+        Args:
+            rate (float): Initial requests per second
+            burst (int): Bucket capacity, defaults to one second of ``rate``
+            min_rate (float): Lower bound for the adapted rate
+            max_rate (float): Upper bound for the adapted rate, defaults to ``4 * rate``
+            increase (float): Requests per second added after each success,
+                defaults to 1/50th of ``max_rate``
+            decrease (float): Factor applied to the rate after each throttle
+            cooldown (float): Minimum seconds between two rate cuts
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate or 4 * rate
+        self.increase = increase or self.max_rate / 50
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._last_cut = float("-inf")
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a token is available and no Retry-After pause is active."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_cut >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                self._tokens = 0.0
+
+
+class RequestScheduler:
+    """
+    Priority-ordered, rate-limited front end for a SPARQLExecutor.
+
+    Queries wait in a priority queue (lowest number first) and are sent by a
+    fixed set of workers through an AdaptiveTokenBucket. Throttled (429/503)
+    and transient failures are retried with jittered exponential backoff, or
+    after the server's Retry-After delay, instead of being dropped. The
+    scheduler exposes ``execute`` and ``run_query`` so it can stand in for
+    the executor.
+    """
+
+    THROTTLE_STATUSES = {429, 503}
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, executor, rate=5.0, burst=None, max_rate=None, workers=4,
+                 max_retries=8, base_delay=1.0, max_delay=60.0):
+        """
+        Args:
+            executor (SPARQLExecutor): Executor whose ``cached`` answers from its
+                response cache and whose ``fetch`` sends the queries
+            rate (float): Initial requests per second
+            burst (int): Token bucket capacity
+            max_rate (float): Ceiling for the adapted request rate
+            workers (int): Number of requests in flight at once
+            max_retries (int): Retries per query before its future fails
+            base_delay (float): First backoff delay in seconds
+            max_delay (float): Cap on a single backoff delay in seconds
+        """
+        self.executor = executor
+        self.bucket = AdaptiveTokenBucket(rate, burst=burst, max_rate=max_rate)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.failures = 0
+        self._ready = []
+        self._delayed = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, query, priority=0, use_cache=True):
+        """Queues a query and returns a Future for its results."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed.")
+            heapq.heappush(self._ready, (priority, next(self._seq), query, use_cache, future, 0))
+            self._cond.notify()
+        return future
+
+    def execute(self, query, priority=0, use_cache=True):
+        """
+        Runs a query through the scheduler and blocks until it succeeds or exhausts its retries.
+
+        Raises:
+            SPARQLRequestError: The last attempt was answered with an error status
+            OSError: The last attempt failed at the network level
+        """
+        return self.submit(query, priority, use_cache).result()
+
+    def run_query(self, query, priority=0):
+        """
+        Runs a query through the scheduler like SPARQLExecutor.run_query.
+
+        Returns:
+            dict: SPARQL JSON results, or None (after logging the error) if the
+            query failed or exhausted its retries
+        """
+        try:
+            return self.execute(query, priority)
+        except Exception as e:
+            print(f"[SPARQL Error] {e}")
+            return None
+
+    def _requeue(self, item, delay):
+        # The future stays in the running state across attempts and is only
+        # resolved by the attempt that finally succeeds or gives up.
+        priority, _, query, use_cache, future, attempt = item
+        with self._cond:
+            self.retries += 1
+            heapq.heappush(self._delayed, (time.monotonic() + delay, priority, next(self._seq),
+                                           query, use_cache, future, attempt + 1))
+            self._cond.notify()
+
+    def _next(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, priority, seq, query, use_cache, future, attempt = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (priority, seq, query, use_cache, future, attempt))
+                if self._ready:
+                    return heapq.heappop(self._ready)
+                if self._closed and not self._delayed:
+                    return None
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            _, _, query, use_cache, future, attempt = item
+            if attempt == 0 and not future.set_running_or_notify_cancel():
+                continue
+            # Cached answers cost no request, so they neither wait for nor spend a token.
+            cached = self.executor.cached(query) if use_cache else None
+            if cached is not None:
+                future.set_result(cached)
+                continue
+            self.bucket.acquire()
+            try:
+                result = self.executor.fetch(query, use_cache=use_cache)
+            except SPARQLRequestError as e:
+                retry_after = parse_retry_after(e.retry_after)
+                if e.status in self.THROTTLE_STATUSES:
+                    self.bucket.on_throttle(retry_after)
+                if e.status in self.RETRYABLE_STATUSES and attempt < self.max_retries:
+                    self._requeue(item, retry_after or self._backoff(attempt))
+                else:
+                    self._fail(future, e)
+            except OSError as e:
+                if attempt < self.max_retries:
+                    self._requeue(item, self._backoff(attempt))
+                else:
+                    self._fail(future, e)
+            except Exception as e:
+                self._fail(future, e)
+            else:
+                self.bucket.on_success()
+                future.set_result(result)
+
+    def _fail(self, future, error):
+        with self._cond:
+            self.failures += 1
+        future.set_exception(error)
+
+    def close(self):
+        """Stops accepting queries, waits for queued ones to finish and joins the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
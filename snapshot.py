@@ -0,0 +1,263 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from rdflib import BNode, Graph, Literal, URIRef
+
+MAGIC = b"TGSNAP03"
+# magic, source size, source mtime (ns), source SHA-256, term count, triple count, id width, namespaces length
+_HEADER = struct.Struct("<8sQq32sQQBQ")
+# Column order of each stored index, as a permutation of (s, p, o).
+INDEX_ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+def snapshot_path(source_path):
+    return f"{source_path}.snap"
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _source_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _matches_source(size, mtime_ns, digest, source_path):
+    """
+    Tells whether a snapshot header describes ``source_path``.
+
+    An unchanged size and mtime is taken as the same content without reading
+    the source; otherwise (a copy, a download, a touched file) the content
+    hash decides.
+    """
+    stamp = _source_stamp(source_path)
+    if stamp == (size, mtime_ns):
+        return True
+    return stamp[0] == size and _source_digest(source_path) == digest
+
+
+def _pad(f):
+    f.write(b"\x00" * (-f.tell() % 8))
+
+
+def _encode_term(term):
+    # kind, language and datatype never contain NUL, so the value is whatever
+    # follows the second separator.
+    if isinstance(term, Literal):
+        return f"L{term.language or ''}\x00{term.datatype or ''}\x00{term}"
+    if isinstance(term, BNode):
+        return f"B\x00\x00{term}"
+    return f"U\x00\x00{term}"
+
+
+def _decode_term(text):
+    head, datatype, value = text.split("\x00", 2)
+    kind, lang = head[0], head[1:]
+    if kind == "L":
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    if kind == "B":
+        return BNode(value)
+    return URIRef(value)
+
+
+def write_snapshot(graph, path, source_path):
+    """
+    Writes a dictionary-encoded binary snapshot of ``graph``.
+
+    Layout after the header: a JSON namespace map, a uint64 offset table into
+    the UTF-8 term blob, the term blob, and the triples as three sorted
+    indexes (SPO, POS, OSP), each stored as three int32 (or int64) id
+    columns. Term ids follow the byte order of the encoded terms, so a term
+    is found by binary search without decoding the table. The header records
+    the size, mtime and SHA-256 of ``source_path``: a source with the same
+    size and mtime is trusted without being read, any other is accepted only
+    if its content hash matches.
+    """
+    ids = {}
+    terms = []
+    flat = array("Q")
+    for triple in graph:
+        for term in triple:
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = len(terms)
+                terms.append(_encode_term(term).encode("utf-8"))
+            flat.append(term_id)
+    del ids
+
+    order = sorted(range(len(terms)), key=terms.__getitem__)
+    remap = array("Q", bytes(8 * len(terms)))
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for new_id, old_id in enumerate(order):
+        remap[old_id] = new_id
+        blob += terms[old_id]
+        offsets.append(len(blob))
+    del terms, order
+
+    width = 4 if len(offsets) - 1 < 2 ** 31 else 8
+    typecode = "i" if width == 4 else "q"
+    bits = max(1, (len(offsets) - 1).bit_length())
+    mask = (1 << bits) - 1
+    columns = [array("Q", (remap[t] for t in flat[i::3])) for i in range(3)]
+    del flat
+    namespaces = json.dumps({prefix: str(ns) for prefix, ns in graph.namespaces()}).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        size, mtime_ns = _source_stamp(source_path)
+        f.write(_HEADER.pack(MAGIC, size, mtime_ns, _source_digest(source_path),
+                             len(offsets) - 1, len(columns[0]), width, len(namespaces)))
+        f.write(namespaces)
+        _pad(f)
+        f.write(offsets.tobytes())
+        f.write(blob)
+        _pad(f)
+        for a, b, c in INDEX_ORDERS.values():
+            # Packing a row into one int lets a plain sort order the rows.
+            keys = sorted((x << 2 * bits) | (y << bits) | z for x, y, z in zip(columns[a], columns[b], columns[c]))
+            f.write(array(typecode, (key >> 2 * bits for key in keys)).tobytes())
+            f.write(array(typecode, ((key >> bits) & mask for key in keys)).tobytes())
+            f.write(array(typecode, (key & mask for key in keys)).tobytes())
+    os.replace(tmp_path, path)
+
+
+class SnapshotTerms:
+    """
+    Term table of a memory-mapped snapshot.
+
+    Terms are decoded on first access and kept, and ``get`` maps a term back
+    to its id by binary search over the sorted encoded terms.
+    """
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _encoded(self, term_id):
+        return bytes(self._blob[self._offsets[term_id]:self._offsets[term_id + 1]])
+
+    def __getitem__(self, term_id):
+        term = self._decoded.get(term_id)
+        if term is None:
+            term = self._decoded[term_id] = _decode_term(self._encoded(term_id).decode("utf-8"))
+        return term
+
+    def get(self, term, default=None):
+        key = _encode_term(term).encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._encoded(lo) == key else default
+
+
+class Snapshot:
+    """
+    A memory-mapped snapshot: its term table, namespaces and index columns.
+
+    ``indexes`` maps "spo", "pos" and "osp" to three id column memoryviews in
+    that index's column order. Nothing is decoded or copied when it is opened.
+    """
+
+    def __init__(self, mm, terms, namespaces, indexes, width):
+        self._mmap = mm
+        self.terms = terms
+        self.namespaces = namespaces
+        self.indexes = indexes
+        self.width = width
+
+    def __len__(self):
+        return len(self.indexes["spo"][0])
+
+
+def read_snapshot(path, source_path):
+    """
+    Memory-maps a snapshot without decoding it.
+
+    Returns:
+        Snapshot: The opened snapshot, or None if it is missing, corrupt or
+        older than ``source_path``
+    """
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    try:
+        return _open_snapshot(mm, source_path)
+    except (ValueError, TypeError, IndexError, struct.error):
+        # Truncated or garbled: a slice came up short or did not decode.
+        return None
+
+
+def _open_snapshot(mm, source_path):
+    view = memoryview(mm)
+    magic, size, mtime_ns, digest, n_terms, n_triples, width, ns_len = _HEADER.unpack_from(view)
+    if magic != MAGIC or width not in (4, 8) or not _matches_source(size, mtime_ns, digest, source_path):
+        return None
+
+    pos = _HEADER.size
+    namespaces = json.loads(bytes(view[pos:pos + ns_len]))
+    pos += ns_len + -(pos + ns_len) % 8
+    offsets = view[pos:pos + 8 * (n_terms + 1)].cast("Q")
+    pos += 8 * (n_terms + 1)
+    blob = view[pos:pos + offsets[-1]]
+    pos += offsets[-1]
+    pos += -pos % 8
+    typecode = "i" if width == 4 else "q"
+    column = width * n_triples
+    indexes = {}
+    for name in INDEX_ORDERS:
+        indexes[name] = [view[pos + i * column:pos + (i + 1) * column].cast(typecode) for i in range(3)]
+        pos += 3 * column
+    if pos > len(view):
+        return None
+    return Snapshot(mm, SnapshotTerms(offsets, blob), namespaces, indexes, width)
+
+
+def load_snapshot(path, source_path, graph=None):
+    """
+    Loads a snapshot.
+
+    Without ``graph`` the snapshot is served in place by a read-optimized
+    CompactStore over the memory-mapped index columns, so loading does not
+    depend on the number of triples. A given ``graph`` (e.g. a mutable
+    in-memory one) instead receives every triple, decoding each term once.
+
+    Returns:
+        Graph: The populated graph, or None if the snapshot is missing or stale
+    """
+    if graph is None:
+        from compact_store import CompactStore
+
+        store = CompactStore()
+        return Graph(store=store) if store.load_snapshot(path, source_path) else None
+
+    snapshot = read_snapshot(path, source_path)
+    if snapshot is None:
+        return None
+    terms = snapshot.terms
+    for prefix, namespace in snapshot.namespaces.items():
+        graph.bind(prefix, namespace, override=True)
+    s_ids, p_ids, o_ids = snapshot.indexes["spo"]
+    graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in zip(s_ids, p_ids, o_ids))
+    return graph
@@ -0,0 +1,109 @@
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamScanner:
+    """Incremental JSON tokenizer over a binary stream, refilled in chunks."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self.decoder.decode(b"", final=True)
+        else:
+            self.buf = self.buf[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of SPARQL JSON results")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of SPARQL JSON results")
+        self.pos += 1
+
+    def skip(self, char):
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more input until it fits in the buffer."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A scalar that ends exactly at the buffer edge may be cut short.
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_bindings(stream, chunk_size=65536):
+    """
+    Yields the bindings of a SPARQL JSON results document one at a time.
+
+    Only the binding being decoded is held in memory, so peak memory is
+    O(binding) rather than O(result) as with ``json.load``.
+
+    Args:
+        stream: Binary file-like object holding an application/sparql-results+json body
+        chunk_size (int): Bytes read from the stream per refill
+    """
+    scanner = _StreamScanner(stream, chunk_size)
+    scanner.expect("{")
+    if scanner.skip("}"):
+        return
+    while True:
+        key = scanner.value()
+        scanner.expect(":")
+        if key == "results" and scanner.peek() == "{":
+            scanner.expect("{")
+            if not scanner.skip("}"):
+                while True:
+                    inner = scanner.value()
+                    scanner.expect(":")
+                    if inner == "bindings":
+                        scanner.expect("[")
+                        if not scanner.skip("]"):
+                            while True:
+                                yield scanner.value()
+                                if scanner.skip("]"):
+                                    break
+                                scanner.expect(",")
+                    else:
+                        scanner.value()
+                    if scanner.skip("}"):
+                        break
+                    scanner.expect(",")
+        else:
+            scanner.value()
+        if scanner.skip("}"):
+            return
+        scanner.expect(",")
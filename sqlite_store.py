@@ -0,0 +1,206 @@
+import os
+import sqlite3
+from functools import lru_cache
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import NO_STORE, VALID_STORE, Store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    lang TEXT NOT NULL DEFAULT '',
+    datatype TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, lang, datatype)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL UNIQUE
+);
+"""
+
+
+def _term_key(term):
+    if isinstance(term, Literal):
+        return ("L", str(term), term.language or "", str(term.datatype or ""))
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+    return ("U", str(term), "", "")
+
+
+def _term_from_row(kind, value, lang, datatype):
+    if kind == "L":
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    if kind == "B":
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    """
+    Disk-backed rdflib Store keeping a dictionary-encoded triple table in SQLite.
+
+    Terms are stored once in a ``terms`` table and triples as integer ids with
+    SPO (primary key), POS and OSP indexes, so every triple pattern is an index
+    range scan. Opening an existing database is O(1), writes are incremental
+    and transactional (``commit``/``rollback``), and memory is bounded by the
+    SQLite page cache plus ``cache_size`` decoded terms rather than by KG size.
+    Only the default graph is supported.
+    """
+
+    transaction_aware = True
+
+    def __init__(self, configuration=None, identifier=None, cache_size=100000):
+        self._conn = None
+        self._term_id = lru_cache(maxsize=cache_size)(self._lookup_term_id)
+        self._term = lru_cache(maxsize=cache_size)(self._lookup_term)
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration, create=False):
+        """Opens the SQLite database at path ``configuration``."""
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        self._conn = sqlite3.connect(configuration, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self._conn is None:
+            return
+        if commit_pending_transaction:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        self._conn.close()
+        self._conn = None
+
+    def destroy(self, configuration):
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._term_id.cache_clear()
+        self._term.cache_clear()
+
+    # Term dictionary
+
+    def _lookup_term_id(self, key):
+        row = self._conn.execute(
+            "SELECT id FROM terms WHERE kind = ? AND value = ? AND lang = ? AND datatype = ?", key
+        ).fetchone()
+        if row is None:
+            # Unknown terms are not cached so that a later insert is seen.
+            raise KeyError(key)
+        return row[0]
+
+    def _lookup_term(self, term_id):
+        return _term_from_row(*self._conn.execute(
+            "SELECT kind, value, lang, datatype FROM terms WHERE id = ?", (term_id,)
+        ).fetchone())
+
+    def _id(self, term):
+        """Returns the id of an existing term, or None if it was never stored."""
+        try:
+            return self._term_id(_term_key(term))
+        except KeyError:
+            return None
+
+    def _intern(self, term):
+        key = _term_key(term)
+        try:
+            return self._term_id(key)
+        except KeyError:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO terms (kind, value, lang, datatype) VALUES (?, ?, ?, ?)", key
+            )
+            return self._term_id(key)
+
+    # RDF APIs
+
+    def add(self, triple, context, quoted=False):
+        s, p, o = triple
+        self._conn.execute(
+            "INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)",
+            (self._intern(s), self._intern(p), self._intern(o)),
+        )
+
+    def addN(self, quads):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)",
+            ((self._intern(s), self._intern(p), self._intern(o)) for s, p, o, _ in quads),
+        )
+
+    def _where(self, triple_pattern):
+        """Builds a WHERE clause for a pattern, or returns None if a bound term is unknown."""
+        clauses, params = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            term_id = self._id(term)
+            if term_id is None:
+                return None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def remove(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is not None:
+            self._conn.execute("DELETE FROM triples" + where[0], where[1])
+
+    def triples(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        term = self._term
+        for s, p, o in self._conn.execute("SELECT s, p, o FROM triples" + where[0], where[1]):
+            yield (term(s), term(p), term(o)), iter(())
+
+    def __len__(self, context=None):
+        # COUNT(*) scans the whole table; use is_empty() for emptiness checks.
+        return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def is_empty(self):
+        """True if the store holds no triples, answered from the first index page."""
+        return self._conn.execute("SELECT 1 FROM triples LIMIT 1").fetchone() is None
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # Namespaces
+
+    def bind(self, prefix, namespace, override=True):
+        if override:
+            self._conn.execute("DELETE FROM namespaces WHERE prefix = ? OR uri = ?", (prefix, str(namespace)))
+            self._conn.execute("INSERT INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+        else:
+            self._conn.execute("INSERT OR IGNORE INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+
+    def prefix(self, namespace):
+        row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespace(self, prefix):
+        row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def namespaces(self):
+        for prefix, uri in self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
@@ -1,15 +1,80 @@
+import argparse
+from contextlib import nullcontext
+
+from checkpoint import CheckpointedIngest
+from delta_sync import DeltaSync, SyncIndex
+from executor import SPARQLExecutor
+from Obuilder import OntologyBuilder
+from response_cache import SPARQLResponseCache
+from scheduler import RequestScheduler
+from TDProcessor import TravelDataProcessor
+from travel_data_parser import TravelGuideQuery
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the travel guide ontology from Wikidata.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of cities fetched in parallel (1 keeps the sequential loop).")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Fetch cities with one VALUES query per batch of this size.")
+    parser.add_argument("--cache", help="SQLite file used to cache SPARQL responses across runs.")
+    parser.add_argument("--cache-ttl", type=float, default=7 * 24 * 3600,
+                        help="Seconds before a cached response is refetched.")
+    parser.add_argument("--pool-size", type=int, default=0,
+                        help="Keep-alive connections to the endpoint (defaults to --workers).")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Initial requests/sec for the adaptive scheduler; retries throttled queries.")
+    parser.add_argument("--poi-page-size", type=int, default=None,
+                        help="Page through all POIs of each city instead of the first 50 (sequential mode).")
+    parser.add_argument("--journal",
+                        help="Write-ahead journal of completed cities; enables checkpointed ingestion.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Replay the journal and skip cities a previous run completed.")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory",
+                        help="Keep the KG in memory or in a persistent SQLite store next to the Turtle file.")
+    parser.add_argument("--export", action="store_true",
+                        help="With --store sqlite, also rewrite the Turtle file from the store at the end.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append changed triples to an N-Triples journal on save instead of rewriting the Turtle file.")
+    parser.add_argument("--seed-dump",
+                        help="N-Triples/N-Quads dump (optionally .gz/.zst) bulk-loaded in parallel before any SPARQL calls.")
+    parser.add_argument("--sync-index",
+                        help="JSON sidecar of dateModified stamps; only cities changed upstream are refetched.")
+    args = parser.parse_args()
+
     city_ids = ["wd:Q1355", "wd:Q60", "wd:Q84", "wd:Q90", "wd:Q1490"]
     endpoint = "https://query.wikidata.org/sparql"
     file_path = "travel_guide_ontology.ttl"
 
-    ontology = OntologyBuilder(file_path)
+    ontology = OntologyBuilder(file_path, store=args.store, incremental=args.incremental)
     graph = ontology.get_graph()
     processor = TravelDataProcessor(graph, ontology.get_uri)
-    executor = SPARQLExecutor(endpoint)
+    if args.seed_dump:
+        ontology.seed_from_dump(args.seed_dump)
+        processor.rebuild_registry()
+    cache = SPARQLResponseCache(args.cache, ttl=args.cache_ttl, max_entries=100000) if args.cache else None
+    pool_size = args.pool_size or args.workers
 
-    for cid in city_ids:
-        processor.process_city(cid, executor)
+    with SPARQLExecutor(endpoint, cache=cache, pool_size=pool_size) as executor, \
+            (RequestScheduler(executor, rate=args.rate, workers=pool_size) if args.rate else nullcontext(executor)) as source:
+        if args.journal or args.resume:
+            CheckpointedIngest(ontology, processor, args.journal or f"{file_path}.journal").run(
+                city_ids, source, resume=args.resume, max_workers=args.workers)
+        elif args.sync_index:
+            DeltaSync(processor, source, SyncIndex(args.sync_index), batch_size=args.batch_size or 200).sync(city_ids)
+        elif args.batch_size:
+            processor.process_cities(city_ids, source, batch_size=args.batch_size, max_workers=args.workers)
+        elif args.workers > 1:
+            processor.process_cities_concurrently(city_ids, source, max_workers=args.workers)
+        else:
+            for cid in city_ids:
+                processor.process_city(cid, source, poi_page_size=args.poi_page_size)
 
-    ontology.save(file_path)
-    query_engine = TravelGuideQuery(file_path)
+    # A persistent store only commits here; exporting it is O(KG), so it is opt-in.
+    ontology.save(file_path if ontology.persistent and args.export else None)
+    ontology.close()
+    if cache is not None:
+        print(f"Response cache: {cache.stats()}")
+        cache.close()
+    if not ontology.persistent or args.export:
+        query_engine = TravelGuideQuery(file_path)
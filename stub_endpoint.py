@@ -0,0 +1,209 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from response_cache import cache_key
+
+
+EMPTY_RESULTS = {"head": {"vars": []}, "results": {"bindings": []}}
+RECORDING_KEY = "recording"
+
+
+def recording_path(directory, query):
+    """Returns the file a recorded response for ``query`` is stored under."""
+    return os.path.join(directory, f"{cache_key(RECORDING_KEY, query)}.json")
+
+
+def record_response(directory, query, results):
+    """Stores a live endpoint response so the replay server can serve it offline."""
+    os.makedirs(directory, exist_ok=True)
+    with open(recording_path(directory, query), "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+
+def synthesize_results(query, pois_per_city=20):
+    """
+    Builds a deterministic SPARQL JSON response shaped like the answer to ``query``.
+
+    One binding is produced per ``wd:Q`` ID in the query, or ``pois_per_city``
+    bindings when the query projects ``?poiName``. Every projected variable gets
+    a literal derived from the QID, except ``?city`` (an entity URI) and
+    ``?modified`` (a fixed timestamp).
+    """
+    match = re.search(r"SELECT\s+(?:DISTINCT\s+)?(.*?)\s+WHERE", query, re.S | re.I)
+    variables = re.findall(r"\?(\w+)", match.group(1)) if match else []
+    qids = list(dict.fromkeys(re.findall(r"wd:(Q\d+)", query)))
+    per_city = pois_per_city if "poiName" in variables else 1
+
+    bindings = []
+    for qid in qids:
+        for n in range(per_city):
+            binding = {}
+            for var in variables:
+                if var == "city":
+                    binding[var] = {"type": "uri", "value": f"http://www.wikidata.org/entity/{qid}"}
+                elif var == "modified":
+                    binding[var] = {"type": "literal", "value": "2024-01-01T00:00:00Z",
+                                    "datatype": "http://www.w3.org/2001/XMLSchema#dateTime"}
+                elif var == "poiName":
+                    binding[var] = {"type": "literal", "value": f"{qid} POI {n}", "xml:lang": "en"}
+                elif var == "cityName":
+                    binding[var] = {"type": "literal", "value": f"City {qid}", "xml:lang": "en"}
+                else:
+                    binding[var] = {"type": "literal", "value": f"{var} {qid}", "xml:lang": "en"}
+            bindings.append(binding)
+    return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+
+class StubSPARQLEndpoint:
+    """
+    Local SPARQL endpoint that replays recorded or synthesized responses.
+
+    Each query is answered with the fixed ``response`` if one is given,
+    otherwise with its recording from ``recordings`` (see record_response),
+    otherwise with synthesize_results. Latency, jitter, 429 throttling and 5xx
+    errors can be injected to benchmark and test ingestion without Wikidata.
+    """
+
+    def __init__(self, response=None, throttle_rate=0.0, retry_after=1, recordings=None,
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, pois_per_city=20,
+                 host="127.0.0.1", port=0):
+        """
+        Args:
+            response (dict): SPARQL JSON results returned for every query
+            throttle_rate (float): Probability that a request is answered with 429
+            retry_after (int): Retry-After seconds sent with each 429, None to omit it
+            recordings (str): Directory of recorded responses
+            latency (float): Seconds added to every response
+            jitter (float): Upper bound in seconds of uniform random extra latency
+            error_rate (float): Probability that a request is answered with ``error_status``
+            error_status (int): HTTP status of injected errors
+            pois_per_city (int): POI bindings per city in synthesized responses
+            host (str): Interface to bind
+            port (int): Port to bind, 0 picks a free one
+        """
+        self.response = response
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.pois_per_city = pois_per_city
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/sparql"
+
+    def results_for(self, query):
+        if self.response is not None:
+            return self.response
+        if self.recordings:
+            path = recording_path(self.recordings, query)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+        if query:
+            return synthesize_results(query, self.pois_per_city)
+        return EMPTY_RESULTS
+
+    def _handler_class(self):
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle on, every
+            # keep-alive request would wait out the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._answer(parse_qs(urlsplit(self.path).query).get("query", [""])[0])
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                if self.headers.get("Content-Type", "").startswith("application/sparql-query"):
+                    self._answer(body)
+                else:
+                    self._answer(parse_qs(body).get("query", [""])[0])
+
+            def _answer(self, query):
+                delay = endpoint.latency + random.uniform(0, endpoint.jitter)
+                if delay:
+                    time.sleep(delay)
+                roll = random.random()
+                with endpoint._lock:
+                    endpoint.requests += 1
+                    throttle = roll < endpoint.throttle_rate
+                    error = not throttle and roll < endpoint.throttle_rate + endpoint.error_rate
+                    endpoint.throttled += throttle
+                    endpoint.errors += error
+                if throttle:
+                    body = b"Too Many Requests"
+                    self.send_response(429)
+                    if endpoint.retry_after is not None:
+                        self.send_header("Retry-After", str(endpoint.retry_after))
+                elif error:
+                    body = b"Injected error"
+                    self.send_response(endpoint.error_status)
+                else:
+                    body = json.dumps(endpoint.results_for(query)).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/sparql-results+json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve recorded or synthesized SPARQL responses locally.")
+    parser.add_argument("--port", type=int, default=8890)
+    parser.add_argument("--recordings", help="Directory of recorded responses.")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubSPARQLEndpoint(recordings=args.recordings, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, throttle_rate=args.throttle_rate, port=args.port)
+    print(f"Serving SPARQL replay endpoint at {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub._server.server_close()
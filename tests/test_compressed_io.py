@@ -0,0 +1,47 @@
+import random
+
+import pytest
+from rdflib import BNode, Graph, Literal, URIRef
+
+from compressed_io import parse_file, serialize_file, zstandard
+
+EX = "http://example.org/"
+
+
+def bnode_joins(graph):
+    """Subject -> blank node links whose blank node still has its own triples."""
+    return sum(1 for _, _, o in graph if isinstance(o, BNode) and (o, None, None) in graph)
+
+
+@pytest.fixture(scope="module")
+def graph():
+    g = Graph()
+    rng = random.Random(7)
+    for i in rng.sample(range(3000), 3000):
+        address = BNode()
+        g.add((URIRef(f"{EX}s{i}"), URIRef(f"{EX}address"), address))
+        g.add((address, URIRef(f"{EX}street"), Literal(f"Street {i}")))
+    return g
+
+
+@pytest.mark.parametrize("name, fmt", [
+    ("kg.nt.gz", "nt"),
+    ("kg.ttl.gz", "turtle"),
+    ("kg.xml.gz", "xml"),
+    pytest.param("kg.ttl.zst", "turtle", marks=pytest.mark.skipif(zstandard is None, reason="needs zstandard")),
+])
+def test_round_trip_keeps_bnode_joins(tmp_path, graph, name, fmt):
+    path = str(tmp_path / name)
+    # Small chunks put most blank nodes in another member than their subject.
+    serialize_file(graph, path, format=fmt, chunk_triples=100)
+    loaded = parse_file(Graph(), path)
+    assert len(loaded) == len(graph)
+    assert bnode_joins(loaded) == bnode_joins(graph) == 3000
+    assert not any(isinstance(term, URIRef) and "/.well-known/genid/" in term for triple in loaded for term in triple)
+
+
+def test_nt_batches_share_bnodes(tmp_path, graph):
+    path = str(tmp_path / "kg.nt.gz")
+    serialize_file(graph, path, format="nt")
+    loaded = parse_file(Graph(), path, batch_size=7)
+    assert bnode_joins(loaded) == 3000
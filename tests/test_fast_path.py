@@ -0,0 +1,208 @@
+from collections import Counter
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+
+from fast_path import FastPath
+from text_index import TextIndex
+from travel_data_parser import TravelGuideQuery
+
+TRAVEL = "http://example.org/travel/"
+
+
+def t(name):
+    return URIRef(TRAVEL + name)
+
+
+def label(text):
+    return Literal(text, lang="en")
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    g = Graph()
+    g.bind("travel", TRAVEL)
+    for name in ("Paris", "Lyon", "Berlin", "Atlantis", "Nowhere", "Twin"):
+        g.add((t(name), RDF.type, t("City")))
+    g.add((t("Paris"), RDFS.label, label("Paris")))
+    g.add((t("Lyon"), RDFS.label, label("Lyon")))
+    g.add((t("Berlin"), RDFS.label, label("Berlin")))
+    g.add((t("Atlantis"), RDFS.label, label("Atlantis")))
+    g.add((t("Twin"), RDFS.label, label("Twin")))
+    g.add((t("Twin"), RDFS.label, label("Twin City")))
+    # Nowhere has no label at all.
+
+    g.add((t("France"), RDF.type, t("Country")))
+    g.add((t("France"), RDFS.label, label("France")))
+    g.add((t("France"), t("hasCapital"), t("Paris")))
+    g.add((t("France"), t("locatedInContinent"), t("Europe")))
+    g.add((t("Europe"), RDFS.label, label("Europe")))
+    g.add((t("Paris"), t("locatedIn"), t("France")))
+    g.add((t("Lyon"), t("locatedIn"), t("France")))
+
+    # Germany has neither capital nor continent labels, so both OPTIONALs miss.
+    g.add((t("Germany"), RDFS.label, label("Germany")))
+    g.add((t("Germany"), t("hasCapital"), t("Bonn")))
+    g.add((t("Berlin"), t("locatedIn"), t("Germany")))
+
+    # An unlabelled country makes the whole country OPTIONAL miss.
+    g.add((t("Atlantis"), t("locatedIn"), t("Sunken")))
+
+    # Twin lies in two countries.
+    g.add((t("Twin"), t("locatedIn"), t("France")))
+    g.add((t("Twin"), t("locatedIn"), t("Germany")))
+
+    pois = [
+        ("Louvre", "Paris", ["museum", "palace"], "Art museum"),
+        ("Eiffel", "Paris", ["landmark"], None),
+        ("Garden", "Paris", [], None),
+        ("Traboules", "Lyon", ["historic site"], "Passages"),
+    ]
+    for poi, city, categories, description in pois:
+        g.add((t(poi), RDF.type, t("PlaceOfInterest")))
+        g.add((t(poi), RDFS.label, label(poi)))
+        g.add((t(city), t("hasPlaceOfInterest"), t(poi)))
+        g.add((t(poi), t("locatedIn"), t(city)))
+        for category in categories:
+            g.add((t(poi), t("category"), label(category)))
+        if description:
+            g.add((t(poi), RDFS.comment, label(description)))
+    # A POI without a label is skipped by both paths.
+    g.add((t("Paris"), t("hasPlaceOfInterest"), t("Unnamed")))
+
+    path = tmp_path_factory.mktemp("fast_path") / "ontology.ttl"
+    g.serialize(path, format="turtle")
+    return TravelGuideQuery(str(path), use_snapshot=False, cache_size=0, text_index=False)
+
+
+@pytest.fixture
+def ontology(engine, tmp_path):
+    path = str(tmp_path / "ontology.ttl")
+    engine.graph.serialize(path, format="turtle")
+    return path
+
+
+@pytest.fixture(scope="module")
+def fast(engine):
+    return FastPath(engine.graph, engine._prepare_travel_uri)
+
+
+def sparql_rows(engine, query_id, **bindings):
+    return Counter(tuple(row) for row in engine.graph.query(engine._queries[query_id], initBindings=bindings))
+
+
+def native_rows(rows):
+    return Counter(tuple(row) for row in rows)
+
+
+def test_all_cities(engine, fast):
+    assert native_rows(fast.all_city_rows()) == sparql_rows(engine, "all_cities")
+
+
+@pytest.mark.parametrize("city", ["Paris", "Lyon", "Berlin", "Atlantis", "Nowhere", "Twin", "Missing", "France"])
+def test_city_details(engine, fast, city):
+    expected = sparql_rows(engine, "city_details", city_uri=t(city))
+    assert native_rows(fast.city_details_rows(t(city))) == expected
+
+
+@pytest.mark.parametrize("city", ["Paris", "Lyon", "Berlin", "Missing"])
+def test_pois_for_city(engine, fast, city):
+    expected = sparql_rows(engine, "pois_for_city", city_uri=t(city))
+    assert native_rows(fast.poi_rows(t(city))) == expected
+
+
+@pytest.mark.parametrize("country", ["France", "Germany", "Sunken", "Missing"])
+def test_cities_in_country(engine, fast, country):
+    expected = sparql_rows(engine, "cities_in_country", country_uri=t(country))
+    assert native_rows(fast.cities_in_country_rows(t(country))) == expected
+
+
+def test_query_methods_agree(engine):
+    engine.fast_path = FastPath(engine.graph, engine._prepare_travel_uri)
+    try:
+        with_fast_path = (
+            [engine.get_city_details(name) for name in ("Paris", "Lyon", "Berlin", "Atlantis", "Missing")],
+            [sorted(engine.get_pois_for_city(name), key=repr) for name in ("Paris", "Lyon", "Missing")],
+            [sorted(engine.get_cities_in_country(name), key=repr) for name in ("France", "Germany", "Missing")],
+        )
+    finally:
+        engine.fast_path = None
+    assert with_fast_path == (
+        [engine.get_city_details(name) for name in ("Paris", "Lyon", "Berlin", "Atlantis", "Missing")],
+        [sorted(engine.get_pois_for_city(name), key=repr) for name in ("Paris", "Lyon", "Missing")],
+        [sorted(engine.get_cities_in_country(name), key=repr) for name in ("France", "Germany", "Missing")],
+    )
+
+
+def keyset_pages(iterate, size):
+    rows, after = [], {}
+    while True:
+        page = list(iterate(limit=size, after=after))
+        rows += page
+        if len(page) < size:
+            return rows
+        after = page[-1]
+
+
+@pytest.mark.parametrize("use_fast_path", [False, True])
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_keyset_pages(engine, use_fast_path, size):
+    engine.fast_path = FastPath(engine.graph, engine._prepare_travel_uri) if use_fast_path else None
+    try:
+        cities = keyset_pages(engine.iter_all_cities, size)
+        pois = keyset_pages(lambda **page: engine.iter_pois_for_city("Paris", **page), size)
+        second_page = list(engine.iter_pois_for_city("Paris", limit=size, offset=1, after={}))
+    finally:
+        engine.fast_path = None
+    assert cities == sorted(engine.iter_all_cities(), key=lambda row: (row["uri"], row["name"]))
+    expected = sorted(engine.iter_pois_for_city("Paris"),
+                      key=lambda row: (row["uri"], row["name"], row["description"] or "", row["category"] or ""))
+    assert pois == expected
+    assert second_page == expected[1:1 + size]
+
+
+@pytest.mark.parametrize("use_text_index", [False, True])
+@pytest.mark.parametrize("keyword", ["museum", "i", "", "nothing"])
+def test_keyset_category_pages(engine, use_text_index, keyword):
+    if use_text_index:
+        engine.text_index = TextIndex.from_graph(engine.graph, t("PlaceOfInterest"), t("category"))
+    try:
+        pages = keyset_pages(lambda **page: engine.iter_search_pois_by_category(keyword, **page), 1)
+    finally:
+        engine.text_index = None
+    expected = sorted({(row["uri"], row["name"]) for row in engine.iter_search_pois_by_category(keyword)})
+    assert [(row["uri"], row["name"]) for row in pages] == expected
+
+
+def test_keyset_pages_follow_writes_without_resorting(engine):
+    first = list(engine.iter_all_cities(limit=2, after={}))
+    cities = engine.keyset_index.members((None, RDF.type, t("City")))
+    engine.graph.add((t("Zurich"), RDF.type, t("City")))
+    engine.graph.add((t("Zurich"), RDFS.label, label("Zurich")))
+    engine.graph.remove((t("Twin"), RDF.type, t("City")))
+    try:
+        rest = keyset_pages(lambda **page: engine.iter_all_cities(after=page["after"] or first[-1], limit=page["limit"]), 2)
+        assert engine.keyset_index.members((None, RDF.type, t("City"))) is cities
+    finally:
+        engine.graph.remove((t("Zurich"), None, None))
+        engine.graph.add((t("Twin"), RDF.type, t("City")))
+    uris = [row["uri"] for row in first + rest]
+    assert uris == sorted(uris)
+    assert TRAVEL + "Zurich" in uris and TRAVEL + "Twin" not in uris
+
+
+def test_text_index_is_built_on_first_search(ontology):
+    searcher = TravelGuideQuery(ontology, use_snapshot=False, cache_size=0)
+    assert not any(isinstance(listener, TextIndex) for listener in searcher.graph.listeners)
+    assert [row["name"] for row in searcher.search_pois("art")] == ["Louvre"]
+    searcher.graph.add((t("Orsay"), RDF.type, t("PlaceOfInterest")))
+    searcher.graph.add((t("Orsay"), RDFS.label, label("Orsay")))
+    searcher.graph.add((t("Orsay"), t("category"), label("art museum")))
+    assert {row["name"] for row in searcher.search_pois("art")} == {"Louvre", "Orsay"}
+
+
+def test_batch_lookups_fall_back_for_names_unsafe_in_query_text(engine):
+    names = ["Paris", "Lyon", 'Say "cheese"', "Curly {brace}", "Back\\slash"]
+    assert engine.get_city_details_many(names) == {name: engine.get_city_details(name) for name in names}
+    assert engine.get_pois_for_cities(names) == {name: engine.get_pois_for_city(name) for name in names}
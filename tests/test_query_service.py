@@ -0,0 +1,49 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+
+from query_service import TravelQueryService
+from travel_data_parser import TravelGuideQuery
+
+TRAVEL = "http://example.org/travel/"
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    g = Graph()
+    for i in range(200):
+        city = URIRef(f"{TRAVEL}City{i}")
+        g.add((city, RDF.type, URIRef(f"{TRAVEL}City")))
+        g.add((city, RDFS.label, Literal(f"City {i}", lang="en")))
+    path = tmp_path_factory.mktemp("query_service") / "ontology.ttl"
+    g.serialize(path, format="turtle")
+    return TravelGuideQuery(str(path), use_snapshot=False, cache_size=0, text_index=False)
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_slow_query_times_out_during_evaluation(engine):
+    # 400^3 solutions: rdflib would spend minutes counting them.
+    query = "SELECT (COUNT(*) AS ?n) WHERE { ?a ?b ?c . ?d ?e ?f . ?g ?h ?i }"
+    with TravelQueryService(engine, workers=1, timeout=1.0) as service:
+        started = time.monotonic()
+        status, body = get(f"{service.url}/sparql?query={quote(query)}")
+        elapsed = time.monotonic() - started
+        assert status == 504, body
+        assert elapsed < 3.0
+        # The worker is free again for the next request.
+        status, cities = get(f"{service.url}/cities?limit=5")
+        assert status == 200 and len(cities) == 5
+        assert service.timeouts == 1
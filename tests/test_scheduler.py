@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from rdflib import Graph, URIRef
+
+from executor import SPARQLExecutor, SPARQLRequestError
+from response_cache import SPARQLResponseCache, cache_key
+from scheduler import RequestScheduler, parse_retry_after
+from stub_endpoint import StubSPARQLEndpoint
+from TDProcessor import TravelDataProcessor
+
+QUERY = "SELECT ?city ?cityName WHERE { VALUES ?city { wd:Q%d } }"
+
+
+def city_names(results):
+    return [b["cityName"]["value"] for b in results["results"]["bindings"]]
+
+
+@pytest.mark.parametrize("pool_size", [None, 2])
+def test_throttled_queries_are_retried(pool_size):
+    with StubSPARQLEndpoint(throttle_rate=0.3, retry_after=None) as stub, \
+            SPARQLExecutor(stub.url, pool_size=pool_size) as executor, \
+            RequestScheduler(executor, rate=200, workers=2, max_retries=20, base_delay=0.01, max_delay=0.05) as scheduler:
+        futures = [scheduler.submit(QUERY % n) for n in range(30)]
+        assert [city_names(f.result(timeout=30)) for f in futures] == [[f"City Q{n}"] for n in range(30)]
+    assert stub.throttled > 0
+    assert scheduler.retries >= stub.throttled
+    assert scheduler.failures == 0
+
+
+@pytest.mark.parametrize("pool_size", [None, 2])
+def test_server_errors_are_retried(pool_size):
+    # Without a pool, SPARQLWrapper reports a 500 as EndPointInternalError.
+    with StubSPARQLEndpoint(error_rate=0.3, error_status=500) as stub, \
+            SPARQLExecutor(stub.url, pool_size=pool_size) as executor, \
+            RequestScheduler(executor, rate=200, workers=2, max_retries=20, base_delay=0.01, max_delay=0.05) as scheduler:
+        results = [scheduler.execute(QUERY % n) for n in range(20)]
+    assert [city_names(r) for r in results] == [[f"City Q{n}"] for n in range(20)]
+    assert stub.errors > 0
+    assert scheduler.failures == 0
+
+
+@pytest.mark.parametrize("pool_size", [None, 2])
+def test_exhausted_retries_raise_with_status(pool_size):
+    with StubSPARQLEndpoint(error_rate=1.0, error_status=500) as stub, \
+            SPARQLExecutor(stub.url, pool_size=pool_size) as executor, \
+            RequestScheduler(executor, rate=200, max_retries=2, base_delay=0.01) as scheduler:
+        with pytest.raises(SPARQLRequestError) as error:
+            scheduler.execute(QUERY % 1)
+    assert error.value.status == 500
+    assert stub.requests == 3
+    assert scheduler.failures == 1
+
+
+def test_run_query_logs_and_returns_none_like_the_executor():
+    # A 400 is not retried; run_query must swallow it as SPARQLExecutor.run_query does.
+    with StubSPARQLEndpoint(error_rate=1.0, error_status=400) as stub, \
+            SPARQLExecutor(stub.url) as executor, \
+            RequestScheduler(executor, rate=200, max_retries=2, base_delay=0.01) as scheduler:
+        assert executor.run_query(QUERY % 1) is None
+        assert scheduler.run_query(QUERY % 1) is None
+        processor = TravelDataProcessor(Graph(), lambda name: URIRef(f"http://example.org/travel/{name}"))
+        assert processor.process_cities(["wd:Q1", "wd:Q2"], scheduler, batch_size=1) in (
+            ["wd:Q1", "wd:Q2"], ["wd:Q2", "wd:Q1"])
+
+
+def test_priority_order():
+    # The latency keeps the only worker busy with the first query while the rest are queued.
+    with StubSPARQLEndpoint(latency=0.05) as stub, SPARQLExecutor(stub.url) as executor:
+        scheduler = RequestScheduler(executor, rate=200, workers=1)
+        order = []
+        blocker = scheduler.submit(QUERY % 0)
+        futures = [scheduler.submit(QUERY % n, priority=-n) for n in range(1, 6)]
+        for future, n in zip(futures, range(1, 6)):
+            future.add_done_callback(lambda _, n=n: order.append(n))
+        blocker.result(timeout=10)
+        scheduler.close()
+    assert order == [5, 4, 3, 2, 1]
+
+
+def test_cached_responses_skip_the_rate_limit(tmp_path):
+    cache = SPARQLResponseCache(str(tmp_path / "cache.sqlite"))
+    with StubSPARQLEndpoint() as stub, SPARQLExecutor(stub.url, cache=cache) as executor:
+        for n in range(20):
+            executor.execute(QUERY % n)
+        requests = stub.requests
+        with RequestScheduler(executor, rate=1, burst=1, workers=2) as scheduler:
+            started = time.monotonic()
+            results = [scheduler.execute(QUERY % n) for n in range(20)]
+            elapsed = time.monotonic() - started
+        assert stub.requests == requests
+    assert [city_names(r) for r in results] == [[f"City Q{n}"] for n in range(20)]
+    # At one token per second, 20 metered requests would take about 19 seconds.
+    assert elapsed < 2
+    cache.close()
+
+
+def test_uncached_queries_bypass_the_cache(tmp_path):
+    cache = SPARQLResponseCache(str(tmp_path / "cache.sqlite"))
+    with StubSPARQLEndpoint() as stub, SPARQLExecutor(stub.url, cache=cache) as executor, \
+            RequestScheduler(executor, rate=200) as scheduler:
+        scheduler.execute(QUERY % 1)
+        scheduler.execute(QUERY % 1, use_cache=False)
+        scheduler.execute(QUERY % 1)
+        assert stub.requests == 2
+    cache.close()
+
+
+def test_cache_key_keeps_whitespace_inside_literals():
+    query = 'SELECT ?x WHERE { ?x rdfs:label "New  York" . ?x ex:note %s }'
+    reformatted = '  SELECT ?x\nWHERE {\n\t?x rdfs:label "New  York" .\n\t?x ex:note %s\n}\n'
+    assert cache_key("e", query % "'''a\n  b'''") == cache_key("e", reformatted % "'''a\n  b'''")
+    assert cache_key("e", query % "'a'") != cache_key("e", (query % "'a'").replace("New  York", "New York"))
+    assert cache_key("e", query % "'''a\n  b'''") != cache_key("e", query % "'''a\n b'''")
+    # A comment ends at its line break, so joining lines changes the query.
+    assert cache_key("e", "# no filter\nSELECT ?x {}") != cache_key("e", "# no filter SELECT ?x {}")
+
+
+def test_response_cache_keeps_its_entry_count(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with SPARQLResponseCache(path, max_entries=5) as cache:
+        for n in range(8):
+            cache.put("e", QUERY % n, {"n": n})
+        cache.put("e", QUERY % 7, {"n": 7})  # a replacement is not a new entry
+        cache.put("e", QUERY % 100, {"n": 100}, ttl=-1)  # already expired
+        assert cache.stats()["entries"] == 5 and cache.evictions == 3
+        assert cache.get("e", QUERY % 2) is None and cache.get("e", QUERY % 3) == {"n": 3}
+        cache.put("e", QUERY % 8, {"n": 8})
+        # The least recently used entry goes first; 3 was just read.
+        assert cache.get("e", QUERY % 4) is None and cache.get("e", QUERY % 3) == {"n": 3}
+    with SPARQLResponseCache(path, max_entries=5) as cache:
+        assert cache.stats()["entries"] == 5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import pytest
+from rdflib import BNode, Graph, Literal, URIRef
+
+from snapshot import load_snapshot, read_snapshot, snapshot_path, write_snapshot
+
+EX = "http://example.org/"
+
+
+@pytest.fixture
+def source(tmp_path):
+    g = Graph()
+    for i in range(50):
+        g.add((URIRef(f"{EX}s{i}"), URIRef(f"{EX}label"), Literal(f"Thing {i}", lang="en")))
+        g.add((URIRef(f"{EX}s{i}"), URIRef(f"{EX}part"), BNode(f"b{i}")))
+    path = str(tmp_path / "kg.ttl")
+    g.serialize(path, format="turtle")
+    write_snapshot(g, snapshot_path(path), path)
+    return path, g
+
+
+def test_snapshot_loads(source):
+    path, g = source
+    assert set(load_snapshot(snapshot_path(path), path, Graph())) == set(g)
+
+
+def test_copied_source_keeps_its_snapshot(source, tmp_path):
+    path, g = source
+    copy = str(tmp_path / "copy.ttl")
+    shutil.copyfile(path, copy)
+    shutil.copyfile(snapshot_path(path), snapshot_path(copy))
+    os.utime(copy, ns=(0, 10 ** 18))
+    assert set(load_snapshot(snapshot_path(copy), copy, Graph())) == set(g)
+
+
+def test_changed_source_of_same_size_is_stale(source):
+    path, _ = source
+    with open(path, "r+b") as f:
+        data = f.read()
+        f.seek(0)
+        f.write(data.replace(b"Thing 1", b"Thing X", 1))
+    assert read_snapshot(snapshot_path(path), path) is None
+
+
+def test_truncated_snapshot_is_rejected(source):
+    path, _ = source
+    snap = snapshot_path(path)
+    with open(snap, "rb") as f:
+        data = f.read()
+    for size in (0, 10, 60, 100, len(data) // 2, len(data) - 1):
+        with open(snap, "wb") as f:
+            f.write(data[:size])
+        assert read_snapshot(snap, path) is None
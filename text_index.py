@@ -0,0 +1,184 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from rdflib.namespace import RDF, RDFS
+
+from keyset_index import SortedTerms
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TextIndex:
+    """
+    Inverted index over the label, comment and category literals of POIs.
+
+    Tokens map to per-POI scores weighted by field, so keyword search is a
+    postings lookup and prefix search a bisect over the sorted vocabulary.
+    Categories are additionally indexed whole, with a trigram index over
+    the distinct category strings, so substring matching only touches the
+    categories that can contain the keyword, and the POIs of a category
+    can be listed in URI order for keyset paging. The index follows a
+    VersionedGraph through its ``triple_added``/``triple_removed`` hooks.
+    """
+
+    def __init__(self, poi_class, category):
+        """
+        Args:
+            poi_class (URIRef): Class whose instances are indexed
+            category (URIRef): Property holding the POI category literal
+        """
+        self.poi_class = poi_class
+        self.category = category
+        self.weights = {RDFS.label: 3, category: 2, RDFS.comment: 1}
+        self.pois = set()
+        self._postings = defaultdict(dict)
+        self._vocabulary = None
+        self._category_pois = defaultdict(dict)
+        self._category_grams = defaultdict(set)
+        self._category_order = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_graph(cls, graph, poi_class, category):
+        index = cls(poi_class, category)
+        for poi in graph.subjects(RDF.type, poi_class):
+            index.pois.add(poi)
+        for predicate in index.weights:
+            for s, p, o in graph.triples((None, predicate, None)):
+                index._index_literal(s, p, o, 1)
+        return index
+
+    def _index_literal(self, subject, predicate, literal, sign):
+        weight = self.weights[predicate] * sign
+        for token in tokenize(str(literal)):
+            if token not in self._postings:
+                self._vocabulary = None
+            scores = self._postings[token]
+            score = scores.get(subject, 0) + weight
+            if score:
+                scores[subject] = score
+            else:
+                scores.pop(subject, None)
+                if not scores:
+                    del self._postings[token]
+                    self._vocabulary = None
+        if predicate == self.category:
+            name = str(literal).lower()
+            pois = self._category_pois[name]
+            count = pois.get(subject, 0) + sign
+            order = self._category_order.get(name)
+            if count:
+                pois[subject] = count
+                if order is not None and count == 1 and sign > 0:
+                    order.add(subject)
+            else:
+                del pois[subject]
+                if order is not None:
+                    order.discard(subject)
+            if not pois:
+                del self._category_pois[name]
+                self._category_order.pop(name, None)
+                for gram in _trigrams(name):
+                    self._category_grams[gram].discard(name)
+            elif sign > 0 and len(pois) == 1:
+                for gram in _trigrams(name):
+                    self._category_grams[gram].add(name)
+
+    def triple_added(self, triple):
+        s, p, o = triple
+        with self._lock:
+            if p == RDF.type and o == self.poi_class:
+                self.pois.add(s)
+            elif p in self.weights:
+                self._index_literal(s, p, o, 1)
+
+    def triple_removed(self, triple):
+        s, p, o = triple
+        with self._lock:
+            if p == RDF.type and o == self.poi_class:
+                self.pois.discard(s)
+            elif p in self.weights:
+                self._index_literal(s, p, o, -1)
+
+    def _tokens_with_prefix(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        i = bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            yield vocabulary[i]
+            i += 1
+
+    def search(self, text, limit=10, prefix=True):
+        """
+        Ranks POIs containing every token of ``text``.
+
+        Args:
+            text (str): Free-text query
+            limit (int): Maximum number of results, or None for all
+            prefix (bool): Let the last token match as a prefix (type-ahead)
+
+        Returns:
+            list: (POI URI, score) pairs, best first
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        with self._lock:
+            scores = None
+            for i, token in enumerate(tokens):
+                if prefix and i == len(tokens) - 1:
+                    matches = {}
+                    for candidate in self._tokens_with_prefix(token):
+                        for poi, score in self._postings[candidate].items():
+                            matches[poi] = matches.get(poi, 0) + score
+                else:
+                    matches = self._postings.get(token, {})
+                if scores is None:
+                    scores = {poi: score for poi, score in matches.items() if poi in self.pois}
+                else:
+                    scores = {poi: score + matches[poi] for poi, score in scores.items() if poi in matches}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def categories_containing(self, keyword):
+        """Returns the distinct lowercased categories that contain ``keyword``."""
+        keyword = keyword.lower()
+        with self._lock:
+            if len(keyword) < 3:
+                return [name for name in self._category_pois if keyword in name]
+            grams = sorted(_trigrams(keyword), key=lambda gram: len(self._category_grams.get(gram, ())))
+            candidates = self._category_grams.get(grams[0], set())
+            return [name for name in candidates if keyword in name]
+
+    def category_counts(self, name):
+        """Returns {POI URI: number of its category literals lowercasing to ``name``}."""
+        with self._lock:
+            return dict(self._category_pois.get(name, {}))
+
+    def category_count(self, name, poi):
+        """Returns the number of category literals of ``poi`` lowercasing to ``name``."""
+        with self._lock:
+            return self._category_pois.get(name, {}).get(poi, 0)
+
+    def category_members(self, name):
+        """Returns the POIs of category ``name`` as SortedTerms, sorted on first use and then kept current."""
+        with self._lock:
+            order = self._category_order.get(name)
+            if order is None:
+                order = SortedTerms(self._category_pois.get(name, ()))
+                if name in self._category_pois:
+                    self._category_order[name] = order
+            return order
@@ -1,11 +1,26 @@
+import heapq
 import json
+import threading
+import weakref
+from itertools import groupby, islice
+from operator import itemgetter
 from SPARQLWrapper import SPARQLWrapper, JSON
 from rdflib import Graph, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, FOAF, XSD
-from urllib.parse import quote
+
+from compressed_io import parse_file
+from entity_registry import EntityRegistry
+from fast_path import FastPath
+from keyset_index import KeysetIndex
+from nt_journal import journal_path, replay_journal
+from query_cache import ResultCache, VersionedGraph, cached_query
+from snapshot import load_snapshot, snapshot_path
+from text_index import TextIndex
+from uri_factory import URIFactory, is_valid_iri
 
 # Define a namespace for your travel guide ontology
 TRAVEL = URIRef("http://example.org/travel/")
+_uri_factory = URIFactory(TRAVEL)
 
 def execute_sparql_query(endpoint_url, query):
     """Executes a SPARQL query against the given endpoint and returns the results in JSON format."""
@@ -20,11 +35,22 @@ def execute_sparql_query(endpoint_url, query):
         return None
 
 def create_uri(name):
-    """Creates a properly encoded URI from a name."""
-    return URIRef(TRAVEL + quote(name.replace(" ", "_")))
+    """Creates a properly encoded URI from a name, interned through a shared URIFactory."""
+    return _uri_factory(name)
+
+_registries = weakref.WeakKeyDictionary()
+
+def registry_for(graph):
+    """Returns the EntityRegistry of a graph, seeded from its existing cities, countries and continents."""
+    registry = _registries.get(graph)
+    if registry is None:
+        classes = [create_uri("City"), create_uri("Country"), create_uri("Continent")]
+        registry = _registries[graph] = EntityRegistry.from_graph(graph, classes)
+    return registry
 
-def parse_city_info(results, graph):
+def parse_city_info(results, graph, registry=None):
     """Parses the results of Query 1 and adds triples to the RDF graph."""
+    registry = registry if registry is not None else registry_for(graph)
     if results and "results" in results and "bindings" in results["results"]:
         for binding in results["results"]["bindings"]:
             city_name = binding.get("cityName", {}).get("value")
@@ -36,25 +62,26 @@ def parse_city_info(results, graph):
                 city_uri = create_uri(city_name)
                 graph.add((city_uri, RDF.type, create_uri("City")))
                 graph.add((city_uri, RDFS.label, Literal(city_name, lang="en")))
+                registry.add(city_uri, create_uri("City"))
 
                 if country_name:
                     country_uri = create_uri(country_name)
                     graph.add((city_uri, create_uri("locatedIn"), country_uri))
-                    if (country_uri, RDF.type, create_uri("Country")) not in graph:
+                    if registry.add(country_uri, create_uri("Country")):
                         graph.add((country_uri, RDF.type, create_uri("Country")))
                         graph.add((country_uri, RDFS.label, Literal(country_name, lang="en")))
 
                         if capital_name:
                             capital_uri = create_uri(capital_name)
                             graph.add((country_uri, create_uri("hasCapital"), capital_uri))
-                            if (capital_uri, RDF.type, create_uri("City")) not in graph:
+                            if registry.add(capital_uri, create_uri("City")):
                                 graph.add((capital_uri, RDF.type, create_uri("City")))
                                 graph.add((capital_uri, RDFS.label, Literal(capital_name, lang="en")))
 
                         if continent_name:
                             continent_uri = create_uri(continent_name)
                             graph.add((country_uri, create_uri("locatedInContinent"), continent_uri))
-                            if (continent_uri, RDF.type, create_uri("Continent")) not in graph:
+                            if registry.add(continent_uri, create_uri("Continent")):
                                 graph.add((continent_uri, RDF.type, create_uri("Continent")))
                                 graph.add((continent_uri, RDFS.label, Literal(continent_name, lang="en")))
     return graph
@@ -215,7 +242,6 @@ def create_ontology():
     
 
 import os
-from rdflib.util import guess_format
 
 # ... [keep all your existing functions] ...
 
@@ -223,8 +249,8 @@ def load_existing_graph(filepath):
     """Loads an existing RDF graph from file if it exists, otherwise creates a new one."""
     graph = Graph()
     if os.path.exists(filepath):
-        file_format = guess_format(filepath)
-        graph.parse(filepath, format=file_format)
+        parse_file(graph, filepath)
+        replay_journal(graph, journal_path(filepath))
     else:
         graph = create_ontology()
     return graph
@@ -295,21 +321,147 @@ from rdflib.namespace import RDF, RDFS
 from rdflib.plugins.sparql import prepareQuery
 
 class TravelGuideQuery:
-    def __init__(self, ontology_file="travel_guide_ontology.owl"):
+    # Compiled once per instance by __init__.
+    QUERIES = {
+        "all_cities": """
+        SELECT ?city ?name
+        WHERE {
+            ?city a travel:City .
+            ?city rdfs:label ?name .
+        }
+        """,
+        "city_details": """
+        SELECT ?name ?country ?countryName ?capital ?capitalName ?continent ?continentName
+        WHERE {
+            BIND(?city_uri AS ?city)
+            ?city a travel:City ;
+                  rdfs:label ?name .
+            OPTIONAL {
+                ?city travel:locatedIn ?country .
+                ?country rdfs:label ?countryName .
+                
+                OPTIONAL {
+                    ?country travel:hasCapital ?capital .
+                    ?capital rdfs:label ?capitalName .
+                }
+                
+                OPTIONAL {
+                    ?country travel:locatedInContinent ?continent .
+                    ?continent rdfs:label ?continentName .
+                }
+            }
+        }
+        """,
+        "pois_for_city": """
+        SELECT ?poi ?name ?description ?category
+        WHERE {
+            BIND(?city_uri AS ?city)
+            ?city travel:hasPlaceOfInterest ?poi .
+            ?poi rdfs:label ?name .
+            OPTIONAL { ?poi rdfs:comment ?description }
+            OPTIONAL { ?poi travel:category ?category }
+        }
+        """,
+        "cities_in_country": """
+        SELECT ?city ?name
+        WHERE {
+            BIND(?country_uri AS ?country)
+            ?city travel:locatedIn ?country .
+            ?city rdfs:label ?name .
+        }
+        """,
+        "pois_by_category": """
+        # SELECT ?poi ?name ?description ?category ?city ?cityName
+        SELECT ?poi ?name
+        WHERE {
+            ?poi a travel:PlaceOfInterest ;
+                rdfs:label ?name ;
+                travel:locatedIn ?city .
+            ?city rdfs:label ?cityName .
+            OPTIONAL { ?poi rdfs:comment ?description }
+            OPTIONAL { ?poi travel:category ?category }
+            FILTER(CONTAINS(LCASE(COALESCE(?category, "")), ?keyword))
+        }
+        """,
+    }
+
+    def __init__(self, ontology_file="travel_guide_ontology.owl", use_snapshot=True, store="memory",
+                 cache_size=4096, text_index=True, fast_path=False):
         """
         Initialize the query engine with the ontology file.
         
         Args:
             ontology_file (str): Path to the OWL ontology file
+            use_snapshot (bool): Load the binary snapshot written next to the file
+                by OntologyBuilder.save when the file has not changed since.
+                An incremental save journal next to the file is replayed on top.
+            store (str): "memory" for rdflib's default store, or "compact" for the
+                read-optimized, NumPy-backed CompactStore, which serves a
+                snapshot in place instead of decoding it into memory
+            cache_size (int): Maximum number of cached query results, or 0 to
+                disable the result cache
+            text_index (bool): Use an inverted index over POI labels, comments
+                and categories for search_pois and search_pois_by_category,
+                built by the first of them to run rather than at startup
+            fast_path (bool): Answer get_city_details, get_pois_for_city and
+                get_cities_in_country from triple patterns instead of SPARQL
         """
-        self.graph = Graph()
-        self.graph.parse(ontology_file, format="xml")
+        if store == "compact":
+            from compact_store import CompactStore
+            self.graph = VersionedGraph(store=CompactStore())
+            loaded = use_snapshot and self.graph.store.load_snapshot(snapshot_path(ontology_file), ontology_file)
+        elif store == "memory":
+            self.graph = VersionedGraph()
+            loaded = use_snapshot and load_snapshot(snapshot_path(ontology_file), ontology_file, self.graph) is not None
+        else:
+            raise ValueError(f"Unknown store: {store}")
+        if not loaded:
+            parse_file(self.graph, ontology_file, default_format="xml")
+        replay_journal(self.graph, journal_path(ontology_file))
         self.TRAVEL = URIRef("http://example.org/travel/")
+        self._uris = URIFactory(self.TRAVEL, encode=False)
+        self._queries = {
+            query_id: prepareQuery(text, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+            for query_id, text in self.QUERIES.items()
+        }
+        self.cache = ResultCache(cache_size) if cache_size else None
+        self.fast_path = FastPath(self.graph, self._prepare_travel_uri) if fast_path else None
+        self._text_index = None
+        self._use_text_index = text_index
+        self._text_index_lock = threading.Lock()
+        self.keyset_index = KeysetIndex(self.graph)
+        self.graph.listeners.append(self.keyset_index)
         
     def _prepare_travel_uri(self, name):
         """Helper method to create URIs in the travel namespace"""
-        return URIRef(self.TRAVEL + name.replace(" ", "_"))
+        return self._uris(name)
+
+    @property
+    def text_index(self):
+        """
+        The TextIndex, or None when disabled.
+
+        Built from the graph on first access, which keeps it out of the
+        startup path of engines that never search, and then kept current
+        through the graph's listeners.
+        """
+        if self._text_index is None and self._use_text_index:
+            with self._text_index_lock:
+                if self._text_index is None:
+                    index = TextIndex.from_graph(
+                        self.graph, self._prepare_travel_uri("PlaceOfInterest"), self._prepare_travel_uri("category"))
+                    self.graph.listeners.append(index)
+                    self._text_index = index
+        return self._text_index
+
+    @text_index.setter
+    def text_index(self, index):
+        if self._text_index in self.graph.listeners:
+            self.graph.listeners.remove(self._text_index)
+        self._text_index = index
+        self._use_text_index = index is not None
     
+    @cached_query("all_cities")
     def get_all_cities(self):
         """
         Get all cities in the ontology.
@@ -317,14 +469,7 @@ class TravelGuideQuery:
         Returns:
             list: List of dictionaries with city info
         """
-        query = """
-        SELECT ?city ?name
-        WHERE {
-            ?city a travel:City .
-            ?city rdfs:label ?name .
-        }
-        """
-        q = prepareQuery(query, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+        q = self._queries["all_cities"]
         
         results = []
         for row in self.graph.query(q):
@@ -334,6 +479,7 @@ class TravelGuideQuery:
             })
         return results
     
+    @cached_query("city_details")
     def get_city_details(self, city_name):
         """
         Get detailed information about a specific city.
@@ -346,49 +492,35 @@ class TravelGuideQuery:
         """
         city_uri = self._prepare_travel_uri(city_name)
         
-        query = """
-        SELECT ?name ?country ?countryName ?capital ?capitalName ?continent ?continentName
-        WHERE {
-            BIND(?city_uri AS ?city)
-            ?city a travel:City ;
-                  rdfs:label ?name .
-            OPTIONAL {
-                ?city travel:locatedIn ?country .
-                ?country rdfs:label ?countryName .
-                
-                OPTIONAL {
-                    ?country travel:hasCapital ?capital .
-                    ?capital rdfs:label ?capitalName .
-                }
-                
-                OPTIONAL {
-                    ?country travel:locatedInContinent ?continent .
-                    ?continent rdfs:label ?continentName .
-                }
-            }
-        }
-        """
-        q = prepareQuery(query, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+        if self.fast_path is not None:
+            rows = self.fast_path.city_details_rows(city_uri)
+        else:
+            rows = self.graph.query(self._queries["city_details"], initBindings={'city_uri': city_uri})
         
         result = {}
-        for row in self.graph.query(q, initBindings={'city_uri': city_uri}):
-            result = {
-                "name": str(row.name),
-                "country": {
-                    "uri": str(row.country),
-                    "name": str(row.countryName)
-                } if row.country else None,
-                "capital": {
-                    "uri": str(row.capital),
-                    "name": str(row.capitalName)
-                } if row.capital else None,
-                "continent": {
-                    "uri": str(row.continent),
-                    "name": str(row.continentName)
-                } if row.continent else None
-            }
+        for row in rows:
+            result = self._city_details_from_row(row)
         return result
+
+    @staticmethod
+    def _city_details_from_row(row):
+        return {
+            "name": str(row.name),
+            "country": {
+                "uri": str(row.country),
+                "name": str(row.countryName)
+            } if row.country else None,
+            "capital": {
+                "uri": str(row.capital),
+                "name": str(row.capitalName)
+            } if row.capital else None,
+            "continent": {
+                "uri": str(row.continent),
+                "name": str(row.continentName)
+            } if row.continent else None
+        }
     
+    @cached_query("pois_for_city")
     def get_pois_for_city(self, city_name):
         """
         Get all points of interest for a city.
@@ -401,28 +533,92 @@ class TravelGuideQuery:
         """
         city_uri = self._prepare_travel_uri(city_name)
         
-        query = """
-        SELECT ?poi ?name ?description ?category
-        WHERE {
-            BIND(?city_uri AS ?city)
-            ?city travel:hasPlaceOfInterest ?poi .
-            ?poi rdfs:label ?name .
-            OPTIONAL { ?poi rdfs:comment ?description }
-            OPTIONAL { ?poi travel:category ?category }
+        if self.fast_path is not None:
+            rows = self.fast_path.poi_rows(city_uri)
+        else:
+            rows = self.graph.query(self._queries["pois_for_city"], initBindings={'city_uri': city_uri})
+        
+        return [self._poi_from_row(row) for row in rows]
+
+    @staticmethod
+    def _poi_from_row(row):
+        return {
+            "uri": str(row.poi),
+            "name": str(row.name),
+            "description": str(row.description) if row.description else None,
+            "category": str(row.category) if row.category else None
         }
+
+    def _batch_rows(self, query_id, city_names):
+        """
+        Yields (city name, row) for many cities from one evaluation.
+
+        The SPARQL path rewrites the single-city query's ``BIND(?city_uri AS ?city)``
+        into a ``VALUES ?city { ... }`` block and projects ``?city``; the fast
+        path sweeps the triple indexes once per city. Names whose URI cannot be
+        written into query text (quotes, spaces, braces...) are answered by the
+        single-city query instead, so they behave as in the single-city methods.
+        """
+        names_by_uri = {}
+        for name in dict.fromkeys(city_names):
+            names_by_uri.setdefault(self._prepare_travel_uri(name), []).append(name)
+        if not names_by_uri:
+            return
+
+        if self.fast_path is not None:
+            native = {"city_details": self.fast_path.city_details_rows, "pois_for_city": self.fast_path.poi_rows}[query_id]
+            for city_uri, names in names_by_uri.items():
+                for row in native(city_uri):
+                    for name in names:
+                        yield name, row
+            return
+
+        for city_uri in [uri for uri in names_by_uri if not is_valid_iri(uri)]:
+            names = names_by_uri.pop(city_uri)
+            for row in self.graph.query(self._queries[query_id], initBindings={'city_uri': city_uri}):
+                for name in names:
+                    yield name, row
+        if not names_by_uri:
+            return
+
+        values = "VALUES ?city { %s }" % " ".join(uri.n3() for uri in names_by_uri)
+        text = self.QUERIES[query_id].replace("BIND(?city_uri AS ?city)", values, 1).replace("SELECT", "SELECT ?city", 1)
+        q = prepareQuery(text, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+        for row in self.graph.query(q):
+            for name in names_by_uri[row.city]:
+                yield name, row
+
+    def get_city_details_many(self, city_names):
         """
-        q = prepareQuery(query, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+        Get details for many cities in one pass.
         
-        results = []
-        for row in self.graph.query(q, initBindings={'city_uri': city_uri}):
-            results.append({
-                "uri": str(row.poi),
-                "name": str(row.name),
-                "description": str(row.description) if row.description else None,
-                "category": str(row.category) if row.category else None
-            })
+        Args:
+            city_names (list): Names of the cities to query
+            
+        Returns:
+            dict: City name -> details as returned by get_city_details ({} if unknown)
+        """
+        results = {name: {} for name in city_names}
+        for name, row in self._batch_rows("city_details", city_names):
+            results[name] = self._city_details_from_row(row)
+        return results
+
+    def get_pois_for_cities(self, city_names):
+        """
+        Get the points of interest of many cities in one pass.
+        
+        Args:
+            city_names (list): Names of the cities
+            
+        Returns:
+            dict: City name -> list of POI dictionaries as returned by get_pois_for_city
+        """
+        results = {name: [] for name in city_names}
+        for name, row in self._batch_rows("pois_for_city", city_names):
+            results[name].append(self._poi_from_row(row))
         return results
     
+    @cached_query("cities_in_country")
     def get_cities_in_country(self, country_name):
         """
         Get all cities located in a specific country.
@@ -435,19 +631,15 @@ class TravelGuideQuery:
         """
         country_uri = self._prepare_travel_uri(country_name)
         
-        query = """
-        SELECT ?city ?name
-        WHERE {
-            BIND(?country_uri AS ?country)
-            ?city travel:locatedIn ?country .
-            ?city rdfs:label ?name .
-        }
-        """
-        q = prepareQuery(query, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+        if self.fast_path is not None:
+            rows = self.fast_path.cities_in_country_rows(country_uri)
+        else:
+            rows = self.graph.query(self._queries["cities_in_country"], initBindings={'country_uri': country_uri})
         
-        return [str(row.name) for row in self.graph.query(q, initBindings={'country_uri': country_uri})]
+        return [str(row.name) for row in rows]
     
 
+    @cached_query("pois_by_category")
     def search_pois_by_category(self, category_keyword):
         """
         Search points of interest by category keyword.
@@ -458,21 +650,10 @@ class TravelGuideQuery:
         Returns:
             list: List of POIs matching the category
         """
-        query = """
-        # SELECT ?poi ?name ?description ?category ?city ?cityName
-        SELECT ?name
-        WHERE {
-            ?poi a travel:PlaceOfInterest ;
-                rdfs:label ?name ;
-                travel:locatedIn ?city .
-            ?city rdfs:label ?cityName .
-            OPTIONAL { ?poi rdfs:comment ?description }
-            OPTIONAL { ?poi travel:category ?category }
-            FILTER(CONTAINS(LCASE(COALESCE(?category, "")), ?keyword))
-        }
-        """
+        if self.text_index is not None:
+            return [{"name": str(name)} for _, name in self._iter_pois_by_category_indexed(category_keyword.lower())]
         try:
-            q = prepareQuery(query, initNs={"travel": self.TRAVEL, "rdfs": RDFS})
+            q = self._queries["pois_by_category"]
             results = []
             for row in self.graph.query(q, initBindings={'keyword': Literal(category_keyword.lower())}):
                 results.append({
@@ -487,6 +668,227 @@ class TravelGuideQuery:
             print(f"Error executing query: {e}")
             return []
 
+    def _iter_pois_by_category_indexed(self, keyword):
+        """
+        Answers search_pois_by_category from the text index, as (POI, label) pairs.
+
+        Produces the same rows as the SPARQL query, including the repeats it
+        yields for every combination of label, city, city label, comment and
+        matching category.
+        """
+        for poi, count in self._category_matches(keyword).items():
+            for name in self._category_rows(poi, count):
+                yield poi, name
+
+    def _category_matches(self, keyword):
+        """Maps every POI matching ``keyword`` to the number of its categories that match."""
+        index = self.text_index
+        slots = {}
+        for name in index.categories_containing(keyword):
+            for poi, count in index.category_counts(name).items():
+                slots[poi] = slots.get(poi, 0) + count
+        if not keyword:
+            # COALESCE(?category, "") lets uncategorized POIs match the empty keyword.
+            for poi in list(index.pois):
+                if next(self.graph.objects(poi, index.category), None) is None:
+                    slots[poi] = 1
+        return {poi: count for poi, count in slots.items() if poi in index.pois}
+
+    def _category_rows(self, poi, count):
+        """Yields the label of a POI with ``count`` matching categories once per row of the SPARQL query."""
+        graph = self.graph
+        located_in = self._prepare_travel_uri("locatedIn")
+        city_labels = sum(1 for city in graph.objects(poi, located_in) for _ in graph.objects(city, RDFS.label))
+        comments = sum(1 for _ in graph.objects(poi, RDFS.comment))
+        repeat = count * city_labels * max(comments, 1)
+        for name in graph.objects(poi, RDFS.label):
+            for _ in range(repeat):
+                yield name
+
+    @cached_query("search_pois")
+    def search_pois(self, text, limit=10, prefix=True):
+        """
+        Ranked keyword search over POI labels, comments and categories.
+
+        Args:
+            text (str): Keywords; every one must match
+            limit (int): Maximum number of results
+            prefix (bool): Let the last keyword match as a prefix
+
+        Returns:
+            list: POI dictionaries with uri, name and score, best match first
+        """
+        if self.text_index is None:
+            raise ValueError("search_pois needs TravelGuideQuery(text_index=True)")
+        return [
+            {"uri": str(poi), "name": str(self.graph.value(poi, RDFS.label)), "score": score}
+            for poi, score in self.text_index.search(text, limit=limit, prefix=prefix)
+        ]
+
+    @staticmethod
+    def _page(rows, limit, offset):
+        """Applies limit/offset to a lazy row stream, so only ``offset + limit`` rows are ever produced."""
+        return islice(rows, offset, offset + limit if limit is not None else None)
+
+    def _keyset_page(self, members, rows_for, limit, offset, after, key):
+        """
+        Keyset page over rows generated subject by subject, in key order.
+
+        ``members(start)`` yields (subject URI, subject, ...) tuples in URI
+        order from ``start`` on, and ``rows_for(subject, ...)`` the rows of one
+        subject. Every row key starts with the row's subject URI, so walking
+        the subjects from the cursor's one and sorting each subject's rows
+        yields the rows in key order while producing only the rows of the
+        subjects the page reaches.
+        """
+        cursor = key(after) if after else None
+
+        def rows():
+            for member in members(cursor[0] if cursor else ""):
+                for row in sorted(rows_for(*member[1:]), key=key):
+                    if cursor is None or key(row) > cursor:
+                        yield row
+
+        return self._page(rows(), limit, offset)
+
+    def _sparql_rows_for(self, query_id, subject, bindings, to_dict):
+        """Returns ``rows_for`` evaluating a SPARQL query for one ``subject`` binding at a time."""
+        query = self._queries[query_id]
+        graph = self.graph
+
+        def rows_for(value, *_):
+            return map(to_dict, graph.query(query, initBindings={**bindings, subject: value}))
+
+        return rows_for
+
+    def _category_members(self, keyword):
+        """
+        Returns ``members(start)`` for the POIs matching ``keyword``, yielding
+        (POI URI, POI, number of its categories that match) in URI order.
+
+        With the text index, the sorted POI lists of the matching categories
+        are merged from ``start``; otherwise the sorted POIs are walked from
+        ``start`` and their categories checked as the query's FILTER does.
+        """
+        index = self.text_index
+        if index is None or not keyword:
+            graph = self.graph
+            category = self._prepare_travel_uri("category")
+            pois = self.keyset_index.members((None, RDF.type, self._prepare_travel_uri("PlaceOfInterest")))
+
+            def members(start):
+                for uri, poi in pois.iter_from(start):
+                    names = [str(name).lower() for name in graph.objects(poi, category)]
+                    # COALESCE(?category, "") lets uncategorized POIs match the empty keyword.
+                    count = sum(keyword in name for name in names) if names else int(not keyword)
+                    if count:
+                        yield uri, poi, count
+
+            return members
+        names = index.categories_containing(keyword)
+
+        def members(start):
+            merged = heapq.merge(*(index.category_members(name).iter_from(start) for name in names),
+                                 key=itemgetter(0))
+            for uri, entries in groupby(merged, key=itemgetter(0)):
+                poi = next(entries)[1]
+                if poi in index.pois:
+                    yield uri, poi, sum(index.category_count(name, poi) for name in names)
+
+        return members
+
+    def iter_all_cities(self, limit=None, offset=0, after=None):
+        """
+        Lazily iterate over the cities returned by get_all_cities.
+        
+        Args:
+            limit (int): Maximum number of rows
+            offset (int): Rows to skip
+            after (dict): Keyset cursor, the last row of the previous page ({} to start)
+            
+        Returns:
+            iterator: City dictionaries with uri and name
+        """
+        def to_dict(row):
+            return {"uri": str(row.city), "name": str(row.name)}
+
+        key = itemgetter("uri", "name")
+        if after is not None:
+            cities = self.keyset_index.members((None, RDF.type, self._prepare_travel_uri("City")))
+            if self.fast_path is not None:
+                def rows_for(city):
+                    return map(to_dict, self.fast_path.city_rows(city))
+            else:
+                rows_for = self._sparql_rows_for("all_cities", "city", {}, to_dict)
+            return self._keyset_page(cities.iter_from, rows_for, limit, offset, after, key)
+        if self.fast_path is not None:
+            rows = self.fast_path.all_city_rows()
+        else:
+            rows = self.graph.query(self._queries["all_cities"])
+        return self._page(map(to_dict, rows), limit, offset)
+
+    def iter_pois_for_city(self, city_name, limit=None, offset=0, after=None):
+        """
+        Lazily iterate over the POIs returned by get_pois_for_city.
+        
+        Args:
+            city_name (str): Name of the city
+            limit (int): Maximum number of rows
+            offset (int): Rows to skip
+            after (dict): Keyset cursor, the last row of the previous page ({} to start)
+            
+        Returns:
+            iterator: POI dictionaries with uri, name, description and category
+        """
+        def key(row):
+            return row["uri"], row["name"], row["description"] or "", row["category"] or ""
+
+        city_uri = self._prepare_travel_uri(city_name)
+        if after is not None:
+            pois = self.keyset_index.members((city_uri, self._prepare_travel_uri("hasPlaceOfInterest"), None))
+            if self.fast_path is not None:
+                def rows_for(poi):
+                    return map(self._poi_from_row, self.fast_path.poi_rows_of(poi))
+            else:
+                rows_for = self._sparql_rows_for("pois_for_city", "poi", {'city_uri': city_uri}, self._poi_from_row)
+            return self._keyset_page(pois.iter_from, rows_for, limit, offset, after, key)
+        if self.fast_path is not None:
+            rows = self.fast_path.poi_rows(city_uri)
+        else:
+            rows = self.graph.query(self._queries["pois_for_city"], initBindings={'city_uri': city_uri})
+        return self._page(map(self._poi_from_row, rows), limit, offset)
+
+    def iter_search_pois_by_category(self, category_keyword, limit=None, offset=0, after=None):
+        """
+        Lazily iterate over the matches of search_pois_by_category.
+        
+        Args:
+            category_keyword (str): Keyword to search in POI categories
+            limit (int): Maximum number of rows
+            offset (int): Rows to skip
+            after (dict): Keyset cursor, the last row of the previous page ({} to start);
+                rows repeated by the query collapse under a cursor
+            
+        Returns:
+            iterator: POI dictionaries with uri and name
+        """
+        def to_dict(row):
+            return {"uri": str(row[0]), "name": str(row[1])}
+
+        keyword = category_keyword.lower()
+        key = itemgetter("uri", "name")
+        if after is not None:
+            if self.text_index is not None:
+                def rows_for(poi, count):
+                    return (to_dict((poi, name)) for name in self._category_rows(poi, count))
+            else:
+                rows_for = self._sparql_rows_for("pois_by_category", "poi", {'keyword': Literal(keyword)}, to_dict)
+            return self._keyset_page(self._category_members(keyword), rows_for, limit, offset, after, key)
+        if self.text_index is not None:
+            rows = self._iter_pois_by_category_indexed(keyword)
+        else:
+            rows = self.graph.query(self._queries["pois_by_category"], initBindings={'keyword': Literal(keyword)})
+        return self._page(map(to_dict, rows), limit, offset)
 
 if __name__ == "__main__":
     # wikidata_endpoint = "https://query.wikidata.org/sparql"
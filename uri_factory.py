@@ -0,0 +1,73 @@
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+from rdflib import URIRef
+
+# Characters the IRIREF production of SPARQL and Turtle excludes.
+_INVALID_IRI_CHARS = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+def is_valid_iri(uri):
+    """True if ``uri`` can be written as ``<uri>`` in SPARQL or Turtle text."""
+    return _INVALID_IRI_CHARS.search(uri) is None
+
+
+class URIFactory:
+    """
+    Interning factory for URIs in one namespace.
+
+    The same name always maps to the same shared URIRef object while it stays
+    in a bounded LRU, so repeated class and property names skip the
+    replace/quote/URIRef work and do not allocate duplicate strings.
+    """
+
+    def __init__(self, namespace, maxsize=65536, encode=True):
+        """
+        Args:
+            namespace (str): Namespace the names are appended to
+            maxsize (int): Maximum number of interned URIs
+            encode (bool): Percent-encode names with ``urllib.parse.quote``
+        """
+        self.namespace = str(namespace)
+        self.maxsize = maxsize
+        self.encode = encode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, name):
+        with self._lock:
+            uri = self._cache.get(name)
+            if uri is not None:
+                self._cache.move_to_end(name)
+                self.hits += 1
+                return uri
+            self.misses += 1
+
+        local = name.replace(" ", "_")
+        uri = URIRef(self.namespace + (quote(local) if self.encode else local))
+
+        with self._lock:
+            uri = self._cache.setdefault(name, uri)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return uri
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, hit rate and number of interned URIs
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+        }